@@ -0,0 +1,231 @@
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from database import count_books, get_generation
+
+STARTED_STATUSES = ["Reading", "Completed", "DNF"]
+PACE_WINDOW_DAYS = 30
+TOP_GROUPS = 5  # genres and authors charted on the Statistics page
+
+# Columns of the books snapshot and their types: categories for the
+# grouping columns, 32-bit numbers (nullable where the column is)
+BOOK_DTYPES = {
+    "id": "int64",
+    "title": "object",
+    "author": "category",
+    "genre": "category",
+    "status": "category",
+    "pages": "Int32",
+    "publication_year": "Int32",
+    "rating": "float32",
+    "date_added": "datetime64[ns]",
+}
+CATEGORY_COLUMNS = [column for column, dtype in BOOK_DTYPES.items() if dtype == "category"]
+EVENT_COLUMNS = ["id", "book_id", "page", "recorded_at"]
+REBUILD_SHARE = 0.25  # reload everything when this share of the books changed
+CLOCK_SKEW = timedelta(seconds=5)  # re-read changes this far back; writers' clocks may differ
+
+
+def _book_frame(rows, extra_columns=()):
+    frame = pd.DataFrame.from_records(rows, columns=[*BOOK_DTYPES, *extra_columns])
+    frame["date_added"] = pd.to_datetime(frame["date_added"], errors="coerce", format="ISO8601")
+    return frame.astype({column: dtype for column, dtype in BOOK_DTYPES.items() if column != "date_added"})
+
+
+def _event_frame(rows):
+    events = pd.DataFrame.from_records(rows, columns=EVENT_COLUMNS)
+    events["recorded_at"] = pd.to_datetime(events["recorded_at"], errors="coerce", format="ISO8601")
+    events = events.astype({"id": "int64", "book_id": "int64", "page": "int32"})
+    return events.sort_values(["book_id", "recorded_at", "id"], ignore_index=True)
+
+
+def _latest(updated_at, default):
+    updated_at = updated_at.dropna()
+    return max(default, updated_at.max()) if len(updated_at) else default
+
+
+# Columnar snapshot of one library: a typed frame of the live books and one
+# of the progress events. refresh() brings it up to the library generation:
+# the first call reads everything, later ones only the books changed or
+# deleted and the events added since. The frames are replaced, never
+# modified, so callers may keep the ones they were given.
+class LibrarySnapshot:
+    def __init__(self):
+        self.books = None
+        self.events = None
+        self.generation = None
+        self._synced_at = ""  # newest updated_at read
+        self._lock = threading.Lock()
+
+    # (books, events) as of the current generation
+    def refresh(self, conn):
+        with self._lock:
+            generation = get_generation(conn)
+            if generation != self.generation:
+                if self.books is None or not self._patch(conn):
+                    self._load(conn)
+                self.generation = generation
+            return self.books, self.events
+
+    def _load(self, conn):
+        books = _book_frame(
+            conn.execute(f"SELECT {', '.join(BOOK_DTYPES)}, updated_at FROM live_books").fetchall(),
+            ["updated_at"],
+        )
+        self._synced_at = _latest(books["updated_at"], "")
+        self.books = books.drop(columns="updated_at")
+        self.events = _event_frame(conn.execute(f"SELECT {', '.join(EVENT_COLUMNS)} FROM reading_progress").fetchall())
+
+    # Apply the changes since the last refresh. Returns False if reloading
+    # is the better (or, after a purge, the only correct) option.
+    def _patch(self, conn):
+        since = datetime.fromisoformat(self._synced_at) - CLOCK_SKEW if self._synced_at else datetime.min
+        rows = conn.execute(
+            f"SELECT {', '.join(BOOK_DTYPES)}, updated_at, deleted_at FROM books WHERE updated_at >= ?",
+            (since.isoformat(sep=" ", timespec="milliseconds"),),
+        ).fetchall()
+        if len(rows) > REBUILD_SHARE * len(self.books):
+            return False
+
+        books = self.books
+        if rows:
+            changed = _book_frame(rows, ["updated_at", "deleted_at"])
+            live = changed[changed["deleted_at"].isna()].drop(columns=["updated_at", "deleted_at"])
+            books = books[~books["id"].isin(changed["id"])]
+            # Both sides need the same categories to stay categorical when joined
+            dtypes = {
+                column: pd.CategoricalDtype(books[column].cat.categories.union(live[column].cat.categories))
+                for column in CATEGORY_COLUMNS
+            }
+            books = pd.concat([books.astype(dtypes), live.astype(dtypes)], ignore_index=True)
+            self._synced_at = _latest(changed["updated_at"], self._synced_at)
+
+        events = self.events
+        last_id = int(events["id"].max()) if len(events) else 0
+        new_events = conn.execute(
+            f"SELECT {', '.join(EVENT_COLUMNS)} FROM reading_progress WHERE id > ?", (last_id,)
+        ).fetchall()
+        if new_events:
+            events = pd.concat([events, _event_frame(new_events)], ignore_index=True)
+            events = events.sort_values(["book_id", "recorded_at", "id"], ignore_index=True)
+
+        # Purged books take their events with them; changes from a writer
+        # whose clock is far behind would be missed. Either shows up here.
+        event_count = conn.execute("SELECT COUNT(*) FROM reading_progress").fetchone()[0]
+        if len(books) != count_books(conn) or len(events) != event_count:
+            return False
+        self.books, self.events = books, events
+        return True
+
+
+def _group_counts(values, label, count_label, limit=None):
+    counts = values.value_counts()
+    counts = counts[counts > 0]
+    frame = counts.rename_axis(label).reset_index(name=count_label)
+    frame = frame.sort_values([count_label, label], ascending=[False, True], ignore_index=True)
+    frame = frame.astype({label: "object"})
+    return frame.head(limit) if limit else frame
+
+
+# Totals and the groupings charted on the Statistics page, from the snapshot
+def compute_library_statistics(books, top=TOP_GROUPS):
+    rated = books["rating"][books["rating"] > 0]
+    months = pd.Series(books["date_added"].dropna().to_numpy().astype("datetime64[M]"))
+    timeline = months.value_counts().sort_index()
+    return {
+        "books": len(books),
+        "pages": int(books["pages"].sum()),
+        "average_rating": float(rated.mean()) if len(rated) else 0.0,
+        "status": _group_counts(books["status"], "Status", "Count"),
+        "timeline": pd.DataFrame({"Month": timeline.index.strftime("%Y-%m"), "Books Added": timeline.to_numpy()}),
+        "genres": _group_counts(books["genre"], "Genre", "Count", top),
+        "authors": _group_counts(books["author"], "Author", "Books", top),
+    }
+
+
+# Pages read per calendar day, from the difference between consecutive
+# progress events of each book (the first event counts from page 0)
+def daily_pages(events, today):
+    if events.empty:
+        return pd.Series(dtype="float64", index=pd.DatetimeIndex([], name="date"), name="pages")
+
+    read = events.groupby("book_id")["page"].diff().fillna(events["page"]).clip(lower=0)
+    per_day = read.groupby(events["recorded_at"].dt.normalize()).sum()
+    days = pd.date_range(per_day.index.min(), max(per_day.index.max(), today), freq="D", name="date")
+    return per_day.reindex(days, fill_value=0).astype("float64").rename("pages")
+
+
+# (current streak, longest streak) of consecutive days with pages read.
+# The current streak survives a day with no reading yet today.
+def reading_streaks(daily):
+    active = daily.to_numpy() > 0
+    if not active.any():
+        return 0, 0
+    idx = np.arange(active.size)
+    last_idle = np.maximum.accumulate(np.where(active, -1, idx))
+    run_lengths = idx - last_idle
+    current = run_lengths[-1] if active[-1] else (run_lengths[-2] if active.size > 1 else 0)
+    return int(current), int(run_lengths.max())
+
+
+# Share of started books (reading, completed or abandoned) finished, per genre
+def completion_by_genre(books):
+    started = books[books["status"].isin(STARTED_STATUSES)]
+    if started.empty:
+        return pd.DataFrame(columns=["Genre", "Started", "Completed", "Completion Rate"])
+    completed = started["status"].eq("Completed")
+    summary = completed.groupby(started["genre"].astype("object").fillna("Other")).agg(["size", "sum"])
+    summary.columns = ["Started", "Completed"]
+    summary["Completion Rate"] = summary["Completed"] / summary["Started"]
+    return (summary.rename_axis("Genre").reset_index()
+            .sort_values(["Completion Rate", "Started"], ascending=False, ignore_index=True))
+
+
+# Expected finish date of every book being read at the recent daily pace
+def forecast_finish(books, events, pace, today):
+    reading = books[books["status"].eq("Reading") & books["pages"].gt(0).fillna(False)]
+    pages = reading["pages"].astype("float64")
+    current = events.groupby("book_id")["page"].last()
+    page = reading["id"].map(current).fillna(0).clip(upper=pages)
+    remaining = pages - page
+
+    forecast = pd.DataFrame({
+        "Title": reading["title"].to_numpy(),
+        "Page": page.astype("int64").to_numpy(),
+        "Pages": pages.astype("int64").to_numpy(),
+        "Percent": (100 * page / pages).round(1).to_numpy(),
+    })
+    if pace > 0:
+        days_left = np.ceil(remaining.to_numpy() / pace)
+        forecast["Days Left"] = days_left.astype("int64")
+        forecast["Expected Finish"] = today + pd.to_timedelta(days_left, unit="D")
+    else:
+        forecast["Days Left"] = pd.NA
+        forecast["Expected Finish"] = pd.NaT
+    return forecast.sort_values("Percent", ascending=False, ignore_index=True)
+
+
+# Everything the Reading Pace section of the Statistics page shows
+def compute_reading_analytics(books, events, today=None):
+    today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+    daily = daily_pages(events, today)
+
+    timeline = daily.to_frame()
+    timeline["7-day average"] = daily.rolling(7, min_periods=1).mean()
+    timeline["30-day average"] = daily.rolling(PACE_WINDOW_DAYS, min_periods=1).mean()
+
+    recent = daily[daily.index > today - pd.Timedelta(days=PACE_WINDOW_DAYS)]
+    pace = float(recent.sum() / PACE_WINDOW_DAYS) if len(recent) else 0.0
+    current_streak, longest_streak = reading_streaks(daily)
+
+    return {
+        "timeline": timeline.rename(columns={"pages": "Pages read"}),
+        "pages_per_day": pace,
+        "current_streak": current_streak,
+        "longest_streak": longest_streak,
+        "completion": completion_by_genre(books),
+        "forecast": forecast_finish(books, events, pace, today),
+    }
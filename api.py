@@ -0,0 +1,394 @@
+import argparse
+import asyncio
+import base64
+import binascii
+import gzip
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import fields
+from urllib.parse import parse_qs
+
+from database import BOOK_SORTS, DB_PATH, EDITABLE_COLUMNS, LIBRARY_DIR, ConnectionRouter, library_path, timestamp
+from importer import validate_row
+from repository import LibraryRepository
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BODY_BYTES = 1024 * 1024
+GZIP_MIN_BYTES = 1024  # smaller responses are sent as they are
+GZIP_LEVEL = 6
+RESPONSE_CACHE_SIZE = 1024  # encoded GET responses kept per process
+STATS_TOP = 10  # authors and genres listed by /stats
+
+# ?sort= values: the My Books sort options as URL slugs ("recently-added")
+SORTS = {name.lower().replace(" ", "-"): name for name in BOOK_SORTS}
+
+HTTP_REASONS = {
+    200: "OK", 201: "Created", 204: "No Content", 304: "Not Modified", 400: "Bad Request",
+    404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Content Too Large",
+    415: "Unsupported Media Type",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTP_REASONS.get(status, ""))
+        self.status = status
+
+
+# One incoming request. Path parameters from the route are in `params`.
+class Request:
+    __slots__ = ("method", "path", "query_string", "query", "headers", "body", "params")
+
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query_string = scope.get("query_string", b"").decode("latin-1")
+        self.query = {key: values[-1] for key, values in parse_qs(self.query_string).items()}
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        self.body = body
+        self.params = {}
+
+    def json(self):
+        if not self.body:
+            raise HTTPError(400, "expected a JSON object in the request body")
+        if "json" not in self.headers.get("content-type", "application/json"):
+            raise HTTPError(415, "send the request body as application/json")
+        try:
+            data = json.loads(self.body)
+        except ValueError as e:
+            raise HTTPError(400, f"invalid JSON: {e}")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "expected a JSON object in the request body")
+        return data
+
+    def int_arg(self, name, default, low, high):
+        value = self.query.get(name)
+        if value is None:
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            raise HTTPError(400, f"{name} must be a whole number")
+        if not low <= number <= high:
+            raise HTTPError(400, f"{name} must be between {low} and {high}")
+        return number
+
+
+def _row_dict(row):
+    return {field.name: getattr(row, field.name) for field in fields(row)}
+
+
+# Page cursors are passed to clients as opaque URL-safe tokens
+def encode_cursor(cursor):
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPError(400, "invalid cursor")
+    # Both halves are bound as query parameters: a sort key and a book id
+    if not (_is_sql_scalar(value) and _is_sql_int(last_id)):
+        raise HTTPError(400, "invalid cursor")
+    return value, last_id
+
+
+def _is_sql_int(value):
+    return type(value) is int and -2**63 <= value < 2**63
+
+
+def _is_sql_scalar(value):
+    return value is None or isinstance(value, (str, float)) or _is_sql_int(value)
+
+
+# Read handlers run on a worker thread with the library's repository and
+# return a JSON-ready value
+
+def list_books(repo, request):
+    status, genre = request.query.get("status"), request.query.get("genre")
+    sort_by = SORTS.get(request.query.get("sort", "title"))
+    if sort_by is None:
+        raise HTTPError(400, f"sort must be one of {', '.join(SORTS)}")
+    limit = request.int_arg("limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    books, next_cursor = repo.books_page(status, genre, sort_by, decode_cursor(request.query.get("cursor")), limit)
+    return {
+        "books": [_row_dict(book) for book in books],
+        "total": repo.count_books(status, genre),
+        "next_cursor": encode_cursor(next_cursor),
+    }
+
+
+def get_book(repo, request):
+    book = repo.get_book(request.params["book_id"])
+    if book is None:
+        raise HTTPError(404, "no such book")
+    return _row_dict(book)
+
+
+def search_books(repo, request):
+    term = request.query.get("q", "").strip()
+    if not term:
+        raise HTTPError(400, "q is required")
+    hits, total = repo.search(term, request.int_arg("limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE))
+    return {"books": [_row_dict(hit) for hit in hits], "total": total}
+
+
+def library_stats(repo, request):
+    return {
+        "totals": _row_dict(repo.totals()),
+        "status": dict(repo.stat_counts("status")),
+        "month": dict(repo.stat_counts("month")),
+        "genre": dict(repo.stat_counts("genre", STATS_TOP)),
+        "author": dict(repo.stat_counts("author", STATS_TOP)),
+    }
+
+
+# Write handlers return (status, JSON-ready value or None)
+
+def _book_values(raw):
+    try:
+        row = validate_row({**raw, "date_added": None}, timestamp())
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+    return row[:8] + row[9:]  # EDITABLE_COLUMNS order; date_added is set on insert
+
+
+def create_book(repo, request):
+    book_id = repo.add_book(_book_values(request.json()))
+    return 201, _row_dict(repo.get_book(book_id))
+
+
+# Change some fields of a book. With "version" in the body the update is
+# compare-and-swapped and answers 409 if the book changed since that version.
+# Fields that already have the given value are left alone, so a PATCH that
+# changes nothing does not bump the version under other clients.
+def update_book(repo, request):
+    changes = request.json()
+    version = changes.pop("version", None)
+    if version is not None and not _is_sql_int(version):
+        raise HTTPError(400, "version must be a whole number")
+    unknown = set(changes) - set(EDITABLE_COLUMNS)
+    if unknown:
+        raise HTTPError(400, f"not editable: {', '.join(sorted(unknown))}")
+    book = repo.get_book(request.params["book_id"])
+    if book is None:
+        raise HTTPError(404, "no such book")
+    values = dict(zip(EDITABLE_COLUMNS, _book_values({**_row_dict(book), **changes})))
+    changes = {column: values[column] for column in changes if values[column] != getattr(book, column)}
+    if changes:
+        if version is None:
+            repo.update_books([book.id], changes)
+        elif repo.apply_edits([(book.id, version, changes)]):
+            raise HTTPError(409, "the book was changed by someone else; fetch it and try again")
+    return 200, _row_dict(repo.get_book(book.id))
+
+
+def delete_book(repo, request):
+    if not repo.delete_books([request.params["book_id"]]):
+        raise HTTPError(404, "no such book")
+    return 204, None
+
+
+def restore_book(repo, request):
+    if not repo.restore_books([request.params["book_id"]]):
+        raise HTTPError(404, "no deleted book with this id")
+    return 200, _row_dict(repo.get_book(request.params["book_id"]))
+
+
+LIBRARY = r"/libraries/(?P<library>[^/]+)"
+ROUTES = [
+    (re.compile(LIBRARY + r"/books"), {"GET": list_books, "POST": create_book}),
+    (re.compile(LIBRARY + r"/books/(?P<book_id>\d+)"),
+     {"GET": get_book, "PATCH": update_book, "DELETE": delete_book}),
+    (re.compile(LIBRARY + r"/books/(?P<book_id>\d+)/restore"), {"POST": restore_book}),
+    (re.compile(LIBRARY + r"/search"), {"GET": search_books}),
+    (re.compile(LIBRARY + r"/stats"), {"GET": library_stats}),
+]
+
+
+def match_route(method, path):
+    for pattern, handlers in ROUTES:
+        match = pattern.fullmatch(path.rstrip("/"))
+        if match:
+            if method == "HEAD":
+                method = "GET"
+            if method not in handlers:
+                raise HTTPError(405, f"{method} is not supported here")
+            params = match.groupdict()
+            if "book_id" in params:
+                params["book_id"] = int(params["book_id"])
+                if not _is_sql_int(params["book_id"]):
+                    raise HTTPError(404, "no such book")
+            return handlers[method], params
+    raise HTTPError(404, "no such endpoint")
+
+
+# Recently encoded GET responses. Entries are keyed on the library
+# generation, so a write makes every older entry unreachable.
+class ResponseCache:
+    def __init__(self, size=RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+# ASGI application serving a JSON API over the same libraries as the app.
+# Database work runs on worker threads with pooled connections; writes go
+# through each library's writer queue, like the app's, so both can run at
+# once without racing.
+class LibraryAPI:
+    def __init__(self, router=None):
+        self.router = router or ConnectionRouter()
+        self.cache = ResponseCache()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.to_thread(self.router.close)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        try:
+            request = Request(scope, await self._read_body(receive))
+            handler, request.params = match_route(request.method, request.path)
+            self._check_library(request.params["library"])
+            if request.method in ("GET", "HEAD"):
+                status, headers, body = await asyncio.to_thread(self._read, handler, request)
+            else:
+                status, headers, body = await asyncio.to_thread(self._write, handler, request)
+        except HTTPError as e:
+            status, headers, body = e.status, [], self._encode({"error": str(e)})
+
+        if body:
+            headers.append((b"content-type", b"application/json"))
+            accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"")
+            if len(body) >= GZIP_MIN_BYTES and b"gzip" in accept_encoding:
+                body = gzip.compress(body, GZIP_LEVEL)
+                headers.append((b"content-encoding", b"gzip"))
+        headers.append((b"vary", b"accept-encoding"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    async def _read_body(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise HTTPError(413, f"request bodies are limited to {MAX_BODY_BYTES} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _check_library(library):
+        try:
+            library_path(library)
+        except ValueError as e:
+            raise HTTPError(404, str(e))
+
+    # Only adding a book creates a library. Anything else on a library that has
+    # no database file is a 404, so requests cannot fill the disk with empty
+    # libraries or the router with connection pools.
+    def _connection(self, library, create=False):
+        try:
+            return self.router.connection(library, create)
+        except FileNotFoundError as e:
+            raise HTTPError(404, str(e))
+
+    @staticmethod
+    def _encode(value):
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+    # GET: answered from the response cache or with 304 while the library
+    # generation (the ETag) is unchanged
+    def _read(self, handler, request):
+        library = request.params["library"]
+        with self._connection(library) as conn:
+            repo = LibraryRepository(conn)
+            etag = f'W/"{repo.generation()}"'
+            headers = [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+            if etag in request.headers.get("if-none-match", ""):
+                return 304, headers, b""
+            key = (library, etag, request.path, request.query_string)
+            body = self.cache.get(key)
+            if body is None:
+                body = self._encode(handler(repo, request))
+                self.cache.put(key, body)
+        return 200, headers, body
+
+    def _write(self, handler, request):
+        with self._connection(request.params["library"], create=handler is create_book) as conn:
+            status, value = handler(LibraryRepository(conn), request)
+        headers = []
+        if status == 201:
+            location = f"{request.path.rstrip('/')}/{value['id']}"
+            headers.append((b"location", location.encode()))
+        return status, headers, b"" if value is None else self._encode(value)
+
+
+# The app keeps the default library's library.db next to its libraries
+# directory. LIBRARY_DIR points the API at that directory when it is started
+# from somewhere else, and the default library is looked up beside it unless
+# LIBRARY_DB gives its path.
+def _router_from_env():
+    library_dir = os.environ.get("LIBRARY_DIR", LIBRARY_DIR)
+    default_path = os.environ.get("LIBRARY_DB") or os.path.join(
+        os.path.dirname(os.path.abspath(library_dir)), DB_PATH
+    )
+    return ConnectionRouter(library_dir, default_path)
+
+
+app = LibraryAPI(_router_from_env())
+
+
+# python api.py [--host H] [--port P] [--workers N]: serve the API with
+# uvicorn (or run `uvicorn api:app` directly)
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Personal Library Manager JSON API")
+    parser.add_argument("--host", default="127.0.0.1", help="default: %(default)s")
+    parser.add_argument("--port", type=int, default=8000, help="default: %(default)s")
+    parser.add_argument("--workers", type=int, default=1, help="server processes (default: %(default)s)")
+    args = parser.parse_args(argv)
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,45 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
-import plotly.express as px
-from streamlit_lottie import st_lottie
-import requests
-from io import BytesIO
-import json
-import time
+import streamlit.components.v1 as components
 from datetime import datetime
-from PIL import Image
-import re
-import os
 import hashlib
-import base64
+import os
+import tempfile
+
+# pandas, Plotly, streamlit_lottie and analytics (numpy) are imported by the
+# functions that use them, so starting a server or opening a page that
+# needs none of them doesn't pay for loading them.
+# python -m benchmarks.startup checks the import time budget.
+from assets import load_lottie
+from covers import generate_book_cover_html
+from database import (
+    BOOK_SORTS, DEFAULT_LIBRARY, EDITABLE_COLUMNS, GENRES, PURGE_RETENTION_DAYS, STATUSES, ConnectionRouter,
+    library_path,
+)
+from exporter import EXPORT_MIME_TYPES, export_books
+from importer import import_books, iter_rows
+from profiling import (
+    profiled, prometheus_text, query_summary, reset as reset_profiling, slowest_queries, timed, timing_summary,
+    write_prometheus,
+)
+from repository import LibraryRepository
+
+SEARCH_RESULT_LIMIT = 50
+PAGE_SIZES = [12, 24, 48, 96]
+READING_PAGE_SIZE = 10
+IMPORT_DEDUPE_OPTIONS = {"Don't skip": None, "Same ISBN": "isbn", "Same title and author": "title-author"}
+EXPORT_FORMAT_OPTIONS = {"CSV": "csv", "JSON Lines": "jsonl", "Parquet": "parquet"}
+
+# The stylesheet is served from ./static (server.enableStaticServing in
+# .streamlit/config.toml). The content hash in the URL lets browsers cache
+# it for good and still pick up every change.
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "style.css")
+with open(STYLESHEET_PATH, "rb") as f:
+    STYLESHEET_URL = f"app/static/style.css?v={hashlib.md5(f.read()).hexdigest()[:8]}"
+KEEP_VALUE = "Keep as is"
+RATING_OPTIONS = {"Not rated": 0.0, **{f"{r / 2:g} ⭐": r / 2 for r in range(1, 11)}}
+# Set to have the Prometheus metrics rewritten after every script run
+METRICS_FILE = os.environ.get("LIBRARY_METRICS_FILE")
+TABLE_COLUMNS = ["title", "author", "genre", "status", "rating", "pages", "publication_year", "isbn", "date_added"]
 
 # Set page configuration
 st.set_page_config(
@@ -24,320 +51,161 @@ st.set_page_config(
 
 # Custom CSS for styling
 def load_css():
-    st.markdown("""
-    <style>
-    .stButton button {
-        background-color: #4f8bf9;
-        color: white;
-        font-weight: bold;
-        border-radius: 5px;
-        border: none;
-        padding: 0.5rem 1rem;
-        transition: all 0.3s ease;
-    }
-    .stButton button:hover {
-        background-color: #3670d6;
-        transform: translateY(-2px);
-        box-shadow: 0 5px 10px rgba(0,0,0,0.2);
-    }
-    .card {
-        background-color: #f8f9fa;
-        border-radius: 10px;
-        padding: 1.5rem;
-        margin-bottom: 1rem;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        transition: transform 0.3s ease;
-    }
-    .card:hover {
-        transform: translateY(-5px);
-    }
-    .card h3 {
-        color: #4f8bf9;
-        margin-bottom: 0.5rem;
-    }
-    .card p {
-        margin-bottom: 0.3rem;
-    }
-    .title {
-        color: #4f8bf9;
-        font-size: 2.5rem;
-        font-weight: bold;
-        margin-bottom: 1rem;
-        text-align: center;
-    }
-    .subtitle {
-        color: #4CAF50;
-        font-size: 1.5rem;
-        margin-bottom: 0.5rem;
-    }
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 2px;
-    }
-    .stTabs [data-baseweb="tab"] {
-        background-color: #f1f3f4;
-        border-radius: 4px 4px 0px 0px;
-        padding: 10px 20px;
-    }
-    .stTabs [aria-selected="true"] {
-        background-color: #4f8bf9;
-        color: white;
-    }
-    .book-cover {
-        border-radius: 5px;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.3);
-        overflow: hidden;
-        position: relative;
-        aspect-ratio: 2/3;
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-        align-items: center;
-        text-align: center;
-        padding: 10px;
-        color: white;
-        font-weight: bold;
-    }
-    .book-title {
-        font-size: 1.2rem;
-        margin-bottom: 0.5rem;
-        line-height: 1.2;
-        overflow-wrap: break-word;
-        word-break: break-word;
-    }
-    .book-author {
-        font-size: 0.9rem;
-        font-style: italic;
-        opacity: 0.9;
-    }
-    .book-icon {
-        position: absolute;
-        bottom: 10px;
-        right: 10px;
-        opacity: 0.3;
-        font-size: 1.5rem;
-    }
-    .dashboard-card {
-        background-color: #f8f9fa;
-        border-radius: 10px;
-        padding: 1.5rem;
-        margin-bottom: 1rem;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        height: 100%;
-        transition: all 0.3s ease;
-    }
-    .dashboard-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 15px rgba(0,0,0,0.2);
-    }
-    .dashboard-card-title {
-        color: #4f8bf9;
-        font-size: 1.2rem;
-        font-weight: bold;
-        margin-bottom: 1rem;
-        display: flex;
-        align-items: center;
-    }
-    .dashboard-card-title svg {
-        margin-right: 0.5rem;
-    }
-    .feature-card {
-        background-color: #f8f9fa;
-        border-radius: 10px;
-        padding: 1.2rem;
-        margin-bottom: 1rem;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        transition: all 0.3s ease;
-        text-align: center;
-    }
-    .feature-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 15px rgba(0,0,0,0.2);
-    }
-    .feature-icon {
-        font-size: 2rem;
-        margin-bottom: 0.5rem;
-    }
-    .feature-title {
-        color: #4f8bf9;
-        font-size: 1.1rem;
-        font-weight: bold;
-        margin-bottom: 0.5rem;
-    }
-    .feature-description {
-        font-size: 0.9rem;
-    }
-    .tooltip {
-        position: relative;
-        display: inline-block;
-        cursor: help;
-    }
-    .tooltip .tooltiptext {
-        visibility: hidden;
-        width: 200px;
-        background-color: #f8f9fa;
-        text-align: center;
-        border-radius: 6px;
-        padding: 5px;
-        position: absolute;
-        z-index: 1;
-        bottom: 125%;
-        left: 50%;
-        margin-left: -100px;
-        opacity: 0;
-        transition: opacity 0.3s;
-        border: 1px solid #4f8bf9;
-    }
-    .tooltip:hover .tooltiptext {
-        visibility: visible;
-        opacity: 1;
-    }
-    .welcome-banner {
-        background: linear-gradient(135deg, #f8f9fa, #e9ecef);
-        border-radius: 10px;
-        padding: 1.5rem;
-        margin-bottom: 1.5rem;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        border-left: 5px solid #4f8bf9;
-    }
-    .welcome-title {
-        color: #4f8bf9;
-        font-size: 1.5rem;
-        font-weight: bold;
-        margin-bottom: 0.5rem;
-    }
-    .welcome-text {
-        margin-bottom: 1rem;
-    }
-    .help-text {
-        background-color: rgba(76, 175, 80, 0.1);
-        border-left: 3px solid #4CAF50;
-        padding: 0.8rem;
-        margin: 1rem 0;
-        border-radius: 0 5px 5px 0;
-    }
-    .status-badge {
-        display: inline-block;
-        padding: 0.25rem 0.5rem;
-        border-radius: 20px;
-        font-size: 0.8rem;
-        font-weight: bold;
-    }
-    .status-reading {
-        background-color: rgba(79, 139, 249, 0.2);
-        color: #4f8bf9;
-    }
-    .status-completed {
-        background-color: rgba(76, 175, 80, 0.2);
-        color: #4CAF50;
-    }
-    .status-to-read {
-        background-color: rgba(255, 193, 7, 0.2);
-        color: #FFC107;
-    }
-    .status-dnf {
-        background-color: rgba(244, 67, 54, 0.2);
-        color: #F44336;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Add the stylesheet to the page head once per session; the browser
+    # caches the file, so reruns send no CSS at all. Streamlit serves .css as
+    # text/plain with nosniff, which a <link> would refuse, so it is fetched
+    # and inserted as a <style> element instead.
+    if st.session_state.get("css_loaded"):
+        return
+    st.session_state.css_loaded = True
+    components.html(f"""
+    <script>
+    const doc = window.parent.document;
+    if (!doc.getElementById("library-css")) {{
+        fetch("{STYLESHEET_URL}", {{cache: "force-cache"}})
+            .then((response) => response.text())
+            .then((css) => {{
+                const style = doc.createElement("style");
+                style.id = "library-css";
+                style.textContent = css;
+                doc.head.appendChild(style);
+            }});
+    }}
+    </script>
+    """, height=0)
 
-# Initialize database
-def init_db():
-    conn = sqlite3.connect('library.db')
-    c = conn.cursor()
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS books (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        author TEXT NOT NULL,
-        genre TEXT,
-        isbn TEXT,
-        publication_year INTEGER,
-        pages INTEGER,
-        rating REAL,
-        status TEXT,
-        date_added TEXT,
-        notes TEXT
-    )
-    ''')
-    
-    # Check if this is a new user (no books in database)
-    book_count = c.execute("SELECT COUNT(*) FROM books").fetchone()[0]
-    is_new_user = book_count == 0
-    
-    conn.commit()
-    return conn, is_new_user
+# Heading with one of the .icon-* icons of the stylesheet
+def section_title(icon, title):
+    st.markdown(f'<div class="dashboard-card-title"><span class="icon icon-{icon}"></span>{title}</div>',
+                unsafe_allow_html=True)
+
+# Cache key for the current library's data: the library id plus its
+# generation, which every write to books bumps
+def cache_version(repo):
+    return st.session_state.library_id, repo.generation()
+
+# Read cache shared by every session. Entries are keyed on the repository
+# method, its arguments and the cache version, so reruns without a write
+# skip the database and a write is never served stale.
+@st.cache_data(max_entries=512, show_spinner=False)
+def _cached_read(_repo, version, method, args):
+    return getattr(_repo, method)(*args)
+
+def cached_read(repo, method, *args):
+    return _cached_read(repo, cache_version(repo), method, args)
+
+# Columnar snapshot of each library, shared by every session and patched
+# with the changes of each write rather than reloaded
+@st.cache_resource
+def library_snapshot(library_id):
+    from analytics import LibrarySnapshot
+    return LibrarySnapshot()
+
+# Statistics page charts and reading pace analytics, derived from the
+# snapshot once per library generation
+@st.cache_data(max_entries=8, show_spinner=False)
+def _cached_statistics(_repo, version):
+    from analytics import compute_library_statistics, compute_reading_analytics
+    books, events = library_snapshot(version[0]).refresh(_repo.conn)
+    return compute_library_statistics(books), compute_reading_analytics(books, events)
 
-# Load animations
-def load_lottie_url(url: str):
+def statistics_cached(repo):
+    return _cached_statistics(repo, cache_version(repo))
+
+# Initialize database (one connection pool per library and migration run per process)
+@st.cache_resource
+def get_connection_router():
+    router = ConnectionRouter(profile=True)
+    router.start_purging()
+    return router
+
+# Borrow a connection to this session's library. Fragments rerun on their
+# own, after main() has returned its connection, so they borrow their own.
+def library_connection():
+    return get_connection_router().connection(st.session_state.library_id)
+
+# Run page(repo) on a borrowed connection
+def with_repository(page):
+    with library_connection() as conn:
+        return page(LibraryRepository(conn))
+
+# Messages from callbacks and writes, shown as toasts on the next run.
+# Kept in session state so they survive whichever rerun comes next.
+def flash(message, icon=None):
+    st.session_state.setdefault("flash_messages", []).append((message, icon))
+
+def show_flash_messages():
+    for message, icon in st.session_state.pop("flash_messages", []):
+        st.toast(message, icon=icon)
+
+# Called by writes that can run inside a fragment: the library changed, so
+# the next run should redraw the whole app rather than just the fragment
+def request_app_rerun():
+    st.session_state.rerun_app = True
+
+# Per-session state that belongs to one library and is dropped when switching
+# (the book selection too, see clear_book_selection)
+LIBRARY_SESSION_KEYS = ["books_view", "edit_book_id", "edit_book_base", "view_book_id", "undo_delete",
+                        "reading_page"]
+
+# The library this session works on, from the ?library= URL parameter
+def select_library():
+    library_id = st.query_params.get("library", DEFAULT_LIBRARY).strip().lower()
     try:
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        return r.json()
-    except Exception:
-        return None
-
-# Generate a dynamic book cover based on book title and author
-def generate_book_cover_html(title, author, genre=None):
-    # Generate a deterministic color based on the title
-    hash_object = hashlib.md5(title.encode())
-    hash_hex = hash_object.hexdigest()
-    
-    # Use the hash to generate a gradient color
-    r1, g1, b1 = int(hash_hex[0:2], 16), int(hash_hex[2:4], 16), int(hash_hex[4:6], 16)
-    r2, g2, b2 = int(hash_hex[6:8], 16), int(hash_hex[8:10], 16), int(hash_hex[10:12], 16)
-    
-    # Ensure colors are vibrant enough
-    r1 = max(r1, 50)
-    g1 = max(g1, 50)
-    b1 = max(b1, 50)
-    
-    # Choose an icon based on genre
-    icon = "📚"  # Default
-    if genre:
-        genre_icons = {
-            "Fiction": "📖",
-            "Non-Fiction": "📋",
-            "Science Fiction": "🚀",
-            "Fantasy": "🧙",
-            "Mystery": "🔍",
-            "Thriller": "🔪",
-            "Romance": "❤️",
-            "Biography": "👤",
-            "History": "⏳",
-            "Self-Help": "🧠",
-            "Business": "💼",
-            "Science": "🔬",
-            "Other": "📚"
-        }
-        icon = genre_icons.get(genre, "📚")
-    
-    # Create HTML for the book cover
-    html = f"""
-    <div class="book-cover" style="background: linear-gradient(135deg, rgb({r1},{g1},{b1}), rgb({r2},{g2},{b2}));">
-        <div class="book-title">{title}</div>
-        <div class="book-author">by {author}</div>
-        <div class="book-icon">{icon}</div>
-    </div>
-    """
-    return html
+        library_path(library_id)
+    except ValueError as e:
+        st.sidebar.error(f"Unknown library '{library_id}': {e}")
+        library_id = DEFAULT_LIBRARY
+    
+    if st.session_state.get("library_id") != library_id:
+        # Book ids repeat across libraries, so the select_<id> checkboxes go too
+        clear_book_selection()
+        for key in LIBRARY_SESSION_KEYS:
+            st.session_state.pop(key, None)
+        st.session_state.library_id = library_id
+    return library_id
+
+def switch_library():
+    library_id = st.session_state.library_input.strip().lower() or DEFAULT_LIBRARY
+    if library_id == DEFAULT_LIBRARY:
+        st.query_params.pop("library", None)
+    else:
+        st.query_params["library"] = library_id
 
 # Get status badge HTML
 def get_status_badge(status):
     status_class = {
-        "Reading": "status-reading",
-        "Completed": "status-completed",
-        "To Read": "status-to-read",
-        "DNF": "status-dnf"
+        "Reading": "reading",
+        "Completed": "completed",
+        "To Read": "to-read",
+        "DNF": "dnf"
     }.get(status, "")
     
-    return f'<span class="status-badge {status_class}">{status}</span>'
+    return f'<span class="badge {status_class}">{status}</span>'
 
 # Main function
 def main():
-    load_css()
-    conn, is_new_user = init_db()
+    try:
+        with timed("script run"):
+            load_css()
+            select_library()
+            with_repository(render_app)
+    finally:
+        if METRICS_FILE:
+            write_prometheus(METRICS_FILE)
+
+# Show a Lottie animation if it is available yet
+def show_lottie(name, **kwargs):
+    animation = load_lottie(name)
+    if animation:
+        from streamlit_lottie import st_lottie
+        st_lottie(animation, **kwargs)
+
+# Sidebar and page routing for one script run
+def render_app(repo):
+    is_new_user = repo.is_empty()
+    st.session_state.pop("rerun_app", None)
+    show_flash_messages()
     
     # Initialize session state for first-time visitors
     if 'first_visit' not in st.session_state:
@@ -346,26 +214,27 @@ def main():
     # Sidebar
     with st.sidebar:
         st.markdown('<div class="title">📚 Library Manager</div>', unsafe_allow_html=True)
+        st.text_input("🏛️ Library", value=st.session_state.library_id, key="library_input",
+                      on_change=switch_library,
+                      help="Each library is stored separately. Share the page URL to open the same library.")
         
         # Lottie animation
-        lottie_book = load_lottie_url("https://assets5.lottiefiles.com/packages/lf20_1cazwtnc.json")
-        if lottie_book:
-            st_lottie(lottie_book, speed=1, height=200, key="book_animation")
+        show_lottie("book", speed=1, height=200, key="book_animation")
         
         st.markdown("---")
         menu = st.radio(
             "📋 Navigation",
-            ["Dashboard", "My Books", "Add Book", "Search", "Statistics", "Help & Tips"]
+            ["Dashboard", "My Books", "Add Book", "Search", "Statistics", "Help & Tips", "Performance"]
         )
         
         st.markdown("---")
         st.markdown("### 📊 Quick Stats")
         
         # Get quick stats
-        c = conn.cursor()
-        total_books = c.execute("SELECT COUNT(*) FROM books").fetchone()[0]
-        reading = c.execute("SELECT COUNT(*) FROM books WHERE status='Reading'").fetchone()[0]
-        completed = c.execute("SELECT COUNT(*) FROM books WHERE status='Completed'").fetchone()[0]
+        total_books = repo.totals().books
+        status_counts = dict(cached_read(repo, "stat_counts", "status"))
+        reading = status_counts.get("Reading", 0)
+        completed = status_counts.get("Completed", 0)
         
         col1, col2, col3 = st.columns(3)
         col1.metric("Total", total_books)
@@ -373,21 +242,24 @@ def main():
         col3.metric("Completed", completed)
     
     # Main content
-    if menu == "Dashboard":
-        display_dashboard(conn, is_new_user)
-    elif menu == "My Books":
-        display_books(conn)
-    elif menu == "Add Book":
-        add_book(conn)
-    elif menu == "Search":
-        search_books(conn)
-    elif menu == "Statistics":
-        display_statistics(conn)
-    elif menu == "Help & Tips":
-        display_help()
+    with timed(f"page:{menu}"):
+        if menu == "Dashboard":
+            display_dashboard(repo, is_new_user)
+        elif menu == "My Books":
+            books_page()
+        elif menu == "Add Book":
+            add_book(repo)
+        elif menu == "Search":
+            search_books(repo)
+        elif menu == "Statistics":
+            display_statistics(repo)
+        elif menu == "Help & Tips":
+            display_help()
+        elif menu == "Performance":
+            display_performance()
 
 # Dashboard page
-def display_dashboard(conn, is_new_user):
+def display_dashboard(repo, is_new_user):
     st.markdown('<div class="title">📊 Dashboard</div>', unsafe_allow_html=True)
     
     # Welcome banner for new users or first visit
@@ -408,72 +280,33 @@ def display_dashboard(conn, is_new_user):
     
     with col1:
         # Recently added books
-        st.markdown("""
-        <div class="dashboard-card-title">
-            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                <path d="M12 8v4l3 3"></path>
-                <circle cx="12" cy="12" r="10"></circle>
-            </svg>
-            Recently Added Books
-        </div>
-        """, unsafe_allow_html=True)
+        section_title("clock", "Recently Added Books")
         
-        c = conn.cursor()
-        recent_books = c.execute(
-            "SELECT id, title, author, genre, status FROM books ORDER BY date_added DESC LIMIT 5"
-        ).fetchall()
+        recent_books = cached_read(repo, "recent_books", 5)
         
         if recent_books:
             for book in recent_books:
                 col_img, col_info = st.columns([1, 3])
                 with col_img:
                     # Dynamic book cover
-                    st.markdown(generate_book_cover_html(book[1], book[2], book[3]), unsafe_allow_html=True)
+                    st.markdown(generate_book_cover_html(book.title, book.author, book.genre), unsafe_allow_html=True)
                 with col_info:
-                    st.markdown(f"**{book[1]}**")
-                    st.markdown(f"By {book[2]}")
-                    st.markdown(f"Genre: {book[3]}")
-                    st.markdown(get_status_badge(book[4]), unsafe_allow_html=True)
+                    st.markdown(f"**{book.title}**")
+                    st.markdown(f"By {book.author}")
+                    st.markdown(f"Genre: {book.genre}")
+                    st.markdown(get_status_badge(book.status), unsafe_allow_html=True)
                 st.markdown("---")
         else:
             st.info("📚 No books added yet. Start building your library by adding your first book!")
     
     with col2:
         # Reading progress
-        st.markdown("""
-        <div class="dashboard-card-title">
-            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                <path d="M2 3h6a4 4 0 0 1 4 4v14a3 3 0 0 0-3-3H2z"></path>
-                <path d="M22 3h-6a4 4 0 0 0-4 4v14a3 3 0 0 1 3-3h7z"></path>
-            </svg>
-            Currently Reading
-        </div>
-        """, unsafe_allow_html=True)
+        section_title("book-open", "Currently Reading")
         
-        reading_books = c.execute(
-            "SELECT id, title, author, genre FROM books WHERE status='Reading' LIMIT 3"
-        ).fetchall()
-        
-        if reading_books:
-            for book in reading_books:
-                st.markdown(generate_book_cover_html(book[1], book[2], book[3]), unsafe_allow_html=True)
-                st.markdown(f"**{book[1]}**")
-                st.markdown(f"By {book[2]}")
-                progress = st.slider(f"Progress for {book[1]}", 0, 100, 25, key=f"progress_{book[0]}")
-                st.progress(progress / 100)
-                st.markdown("---")
-        else:
-            st.info("📖 You're not currently reading any books. Start a new book today!")
+        reading_progress_panel()
     
     # Feature highlights
-    st.markdown("""
-    <div class="dashboard-card-title">
-        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <polygon points="12 2 15.09 8.26 22 9.27 17 14.14 18.18 21.02 12 17.77 5.82 21.02 7 14.14 2 9.27 8.91 8.26 12 2"></polygon>
-        </svg>
-        App Features
-    </div>
-    """, unsafe_allow_html=True)
+    section_title("star", "App Features")
     
     feature_col1, feature_col2, feature_col3, feature_col4 = st.columns(4)
     
@@ -514,34 +347,99 @@ def display_dashboard(conn, is_new_user):
         """, unsafe_allow_html=True)
     
     # Genre distribution
-    st.markdown("""
-    <div class="dashboard-card-title">
-        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <path d="M21.21 15.89A10 10 0 1 1 8 2.83"></path>
-            <path d="M22 12A10 10 0 0 0 12 2v10z"></path>
-        </svg>
-        Genre Distribution
-    </div>
-    """, unsafe_allow_html=True)
+    section_title("pie-chart", "Genre Distribution")
     
-    genres = c.execute(
-        "SELECT genre, COUNT(*) as count FROM books GROUP BY genre ORDER BY count DESC"
-    ).fetchall()
+    genres = cached_read(repo, "stat_counts", "genre")
     
     if genres:
-        genre_df = pd.DataFrame(genres, columns=["Genre", "Count"])
-        fig = px.pie(genre_df, values="Count", names="Genre", hole=0.4)
-        fig.update_layout(
-            margin=dict(l=20, r=20, t=30, b=20),
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        # The landing page draws its one chart with graph_objects, which
+        # doesn't need pandas or plotly.express
+        import plotly.graph_objects as go
+        labels, counts = zip(*genres)
+        with timed("plotly"):
+            fig = go.Figure(go.Pie(labels=labels, values=counts, hole=0.4,
+                                   hovertemplate="Genre=%{label}<br>Count=%{value}<extra></extra>"))
+            fig.update_layout(
+                margin=dict(l=20, r=20, t=30, b=20),
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+            )
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("Add some books to see your genre distribution!")
 
+# Currently Reading panel of the Dashboard. A fragment, so saving progress
+# reruns just this panel instead of the whole page.
+@st.fragment
+@profiled("fragment:Currently Reading")
+def reading_progress_panel():
+    show_flash_messages()
+    with_repository(display_reading_progress)
+
+# Books being read, READING_PAGE_SIZE per page, most recently read first
+def display_reading_progress(repo):
+    reading_total = dict(cached_read(repo, "stat_counts", "status")).get("Reading", 0)
+    last_page = max(0, (reading_total - 1) // READING_PAGE_SIZE)
+    page = st.session_state.reading_page = min(st.session_state.get("reading_page", 0), last_page)
+    reading_books = cached_read(repo, "reading_books", READING_PAGE_SIZE, page * READING_PAGE_SIZE)
+    
+    if reading_books:
+        # All sliders are saved together in one batch when the form is submitted
+        with st.form("reading_progress"):
+            for book in reading_books:
+                st.markdown(generate_book_cover_html(book.title, book.author, book.genre), unsafe_allow_html=True)
+                st.markdown(f"**{book.title}**")
+                st.markdown(f"By {book.author}")
+                if book.pages:
+                    st.slider(f"Page reached in {book.title}", 0, book.pages, min(book.current_page, book.pages),
+                              key=f"progress_{book.id}")
+                    st.progress(book.percent / 100, text=f"{book.percent:.0f}% read")
+                else:
+                    st.caption("Add a page count to this book to track your progress.")
+                st.markdown("---")
+            
+            st.form_submit_button("💾 Save Progress", use_container_width=True,
+                                  on_click=save_reading_progress, args=(repo, reading_books))
+        
+        if last_page:
+            first_shown = page * READING_PAGE_SIZE + 1
+            col1, col2 = st.columns(2)
+            with col1:
+                st.button("⬅️ Previous", on_click=show_reading_page, args=(page - 1,), disabled=page == 0,
+                          use_container_width=True, key="reading_prev")
+            with col2:
+                st.button("Next ➡️", on_click=show_reading_page, args=(page + 1,), disabled=page == last_page,
+                          use_container_width=True, key="reading_next")
+            st.caption(f"Showing books {first_shown}–{first_shown + len(reading_books) - 1} "
+                       f"of {reading_total:,} in progress")
+    else:
+        st.info("📖 You're not currently reading any books. Start a new book today!")
+
+def show_reading_page(page):
+    st.session_state.reading_page = page
+
+def save_reading_progress(repo, reading_books):
+    updates = [
+        (book.id, st.session_state[f"progress_{book.id}"])
+        for book in reading_books
+        if book.pages and st.session_state[f"progress_{book.id}"] != book.current_page
+    ]
+    if updates:
+        repo.record_progress(updates)
+        flash(f"Progress saved for {len(updates)} book{'s' if len(updates) != 1 else ''}.", "📖")
+
+# My Books page as a fragment: filter, paging, selection and edit-form
+# interactions rerun only this page, not the sidebar around it
+@st.fragment
+@profiled("fragment:My Books")
+def books_page():
+    # A write from this page changed the sidebar stats too
+    if st.session_state.pop("rerun_app", False):
+        st.rerun()
+    with_repository(display_books)
+
 # Books page
-def display_books(conn):
+def display_books(repo):
     st.markdown('<div class="title">📚 My Books</div>', unsafe_allow_html=True)
     
     # Help text
@@ -558,81 +456,293 @@ def display_books(conn):
         status_filter = st.selectbox("📊 Filter by Status", ["All", "Reading", "Completed", "To Read", "DNF"], 
                                     help="Select a reading status to filter your books")
     with col2:
-        c = conn.cursor()
-        genres = [row[0] for row in c.execute("SELECT DISTINCT genre FROM books").fetchall()]
-        genres = ["All"] + genres
+        genres = ["All"] + cached_read(repo, "genres")
         genre_filter = st.selectbox("🏷️ Filter by Genre", genres,
                                    help="Select a genre to filter your books")
     with col3:
-        sort_by = st.selectbox("🔄 Sort by", ["Title", "Author", "Rating", "Recently Added"],
+        sort_by = st.selectbox("🔄 Sort by", list(BOOK_SORTS),
                               help="Choose how to sort your book list")
     
-    # Build query
-    query = "SELECT * FROM books"
-    params = []
-    
-    if status_filter != "All":
-        query += " WHERE status = ?"
-        params.append(status_filter)
+    status = None if status_filter == "All" else status_filter
+    genre = None if genre_filter == "All" else genre_filter
     
-    if genre_filter != "All":
-        if "WHERE" in query:
-            query += " AND genre = ?"
-        else:
-            query += " WHERE genre = ?"
-        params.append(genre_filter)
-    
-    if sort_by == "Title":
-        query += " ORDER BY title"
-    elif sort_by == "Author":
-        query += " ORDER BY author"
-    elif sort_by == "Rating":
-        query += " ORDER BY rating DESC"
-    elif sort_by == "Recently Added":
-        query += " ORDER BY date_added DESC"
-    
-    # Execute query
-    c = conn.cursor()
-    books = c.execute(query, params).fetchall()
-    
-    if not books:
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        page_size = st.select_slider("📄 Books per page", options=PAGE_SIZES, value=PAGE_SIZES[1],
+                                     help="How many books to show at once")
+    with col2:
+        layout = st.radio("👁️ View", ["🗂️ Cards", "📋 Table"], horizontal=True, key="books_layout",
+                          help="Edit several books at once in the table view")
+    
+    # Pagination state resets whenever the filters, sort or page size change
+    view = (status, genre, sort_by, page_size)
+    if st.session_state.get("books_view") != view:
+        st.session_state.books_view = view
+        st.session_state.books_cursor = None  # where the current screen starts
+        st.session_state.books_loaded = 1  # pages shown on the current screen
+        st.session_state.books_history = []  # (cursor, loaded) of earlier screens
+        st.session_state.books_editor_run = st.session_state.get("books_editor_run", 0) + 1
+    
+    total_books = cached_read(repo, "count_books", status, genre)
+    if not total_books:
         st.info("No books found with the selected filters.")
         return
     
-    # Display books in a grid
+    books, next_cursor = repo.books_page(status, genre, sort_by,
+                                         cursor=st.session_state.books_cursor,
+                                         limit=page_size * st.session_state.books_loaded)
+    if not books:
+        # The books on this screen were removed; start over from the first page
+        del st.session_state.books_view
+        st.rerun()
+    
+    undo_banner(repo)
+    
+    # Books ticked on any page, edited or deleted together in one transaction
+    selected = st.session_state.setdefault("selected_books", set())
+    if selected:
+        batch_edit_bar(repo, selected)
+    
+    if layout == "📋 Table":
+        books_table(repo, books)
+    else:
+        books_grid(repo, books, selected)
+    
+    # Page controls
+    first_page = sum(loaded for _, loaded in st.session_state.books_history) + 1
+    last_page = first_page + st.session_state.books_loaded - 1
+    total_pages = -(-total_books // page_size)
+    first_shown = (first_page - 1) * page_size + 1
+    st.markdown(f"Showing books {first_shown}–{first_shown + len(books) - 1} of {total_books}")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.button("⬅️ Previous", on_click=show_previous_books_page, disabled=first_page == 1,
+                  use_container_width=True, key="books_prev")
+    with col2:
+        st.button("⬇️ Load more", on_click=load_more_books, disabled=next_cursor is None,
+                  use_container_width=True, key="books_more")
+    with col3:
+        st.button("Next ➡️", on_click=show_next_books_page, args=(next_cursor,),
+                  disabled=next_cursor is None, use_container_width=True, key="books_next")
+    if first_page == last_page:
+        st.caption(f"Page {first_page} of {total_pages}")
+    else:
+        st.caption(f"Pages {first_page}–{last_page} of {total_pages}")
+    
+    export_section(repo, status, genre)
+    
+    # Edit book modal
+    if hasattr(st.session_state, 'edit_book_id'):
+        edit_book_modal(repo, st.session_state.edit_book_id)
+
+# Display books in a grid of cards
+def books_grid(repo, books, selected):
     cols = st.columns(3)
     for i, book in enumerate(books):
         with cols[i % 3]:
             with st.container():
                 # Add dynamic book cover at the top of the card
-                st.markdown(generate_book_cover_html(book[1], book[2], book[3]), unsafe_allow_html=True)
+                st.markdown(generate_book_cover_html(book.title, book.author, book.genre), unsafe_allow_html=True)
                 
-                # Updated card HTML with explicit text colors
-                st.markdown(f"""
-                <div class="card">
-                    <h3>{book[1]}</h3>
-                    <p>By {book[2]}</p>
-                    <p>Genre: {book[3]}</p>
-                    <p>Status: {get_status_badge(book[8])}</p>
-                    <p>Rating: {"⭐" * int(book[7]) if book[7] else "Not rated"}</p>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(book_card_html(book), unsafe_allow_html=True)
                 
-                col1, col2 = st.columns(2)
+                col1, col2, col3 = st.columns([2, 2, 1])
                 with col1:
-                    if st.button("✏️ Edit", key=f"edit_{book[0]}", help="Edit book details"):
-                        st.session_state.edit_book_id = book[0]
+                    if st.button("✏️ Edit", key=f"edit_{book.id}", help="Edit book details"):
+                        st.session_state.edit_book_id = book.id
                 with col2:
-                    if st.button("🗑️ Delete", key=f"delete_{book[0]}", help="Remove this book from your library"):
-                        delete_book(conn, book[0])
-                        st.rerun()
+                    st.button("🗑️ Delete", key=f"delete_{book.id}", help="Remove this book from your library",
+                              on_click=delete_book, args=(repo, [book.id]))
+                with col3:
+                    key = f"select_{book.id}"
+                    if key not in st.session_state:
+                        st.session_state[key] = book.id in selected
+                    st.checkbox("Select", key=key, on_change=toggle_book_selection, args=(book.id,),
+                                label_visibility="collapsed", help="Select to edit or delete several books at once")
+
+# Card body under a cover: one line of class-based markup, since every
+# My Books page sends dozens of these
+def book_card_html(book):
+    rating = "⭐" * int(book.rating) if book.rating else "Not rated"
+    return (f'<div class="card"><h3>{book.title}</h3><p>By {book.author}</p><p>Genre: {book.genre}</p>'
+            f'<p>Status: {get_status_badge(book.status)}</p><p>Rating: {rating}</p></div>')
+
+# Batch actions for the selected books. Each one is a single write.
+def batch_edit_bar(repo, selected):
+    with st.container(border=True):
+        st.markdown(f"**{len(selected)} book{'s' if len(selected) != 1 else ''} selected**")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.selectbox("📊 Set status", [KEEP_VALUE] + STATUSES, key="batch_status")
+        with col2:
+            st.selectbox("🏷️ Set genre", [KEEP_VALUE] + GENRES, key="batch_genre")
+        with col3:
+            st.selectbox("⭐ Set rating", [KEEP_VALUE] + list(RATING_OPTIONS), key="batch_rating")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.button("✅ Apply to selected", on_click=apply_batch_edit, args=(repo,),
+                      use_container_width=True, key="apply_batch_edit")
+        with col2:
+            st.button(f"🗑️ Delete selected ({len(selected)})", on_click=delete_selected_books, args=(repo,),
+                      use_container_width=True, key="delete_selected")
+        with col3:
+            st.button("✖️ Clear selection", on_click=clear_book_selection,
+                      use_container_width=True, key="clear_selection")
+
+def apply_batch_edit(repo):
+    changes = {}
+    if st.session_state.batch_status != KEEP_VALUE:
+        changes["status"] = st.session_state.batch_status
+    if st.session_state.batch_genre != KEEP_VALUE:
+        changes["genre"] = st.session_state.batch_genre
+    if st.session_state.batch_rating != KEEP_VALUE:
+        changes["rating"] = RATING_OPTIONS[st.session_state.batch_rating]
+    if not changes:
+        flash("Choose a status, genre or rating to set first.", "⚠️")
+        return
     
-    # Edit book modal
-    if hasattr(st.session_state, 'edit_book_id'):
-        edit_book_modal(conn, st.session_state.edit_book_id)
+    updated = repo.update_books(sorted(st.session_state.selected_books), changes)
+    request_app_rerun()
+    for key in ("batch_status", "batch_genre", "batch_rating"):
+        st.session_state[key] = KEEP_VALUE
+    flash(f"Updated {updated} book{'s' if updated != 1 else ''}.", "✅")
+
+# Spreadsheet-style editing of the books on screen. Only the cells that were
+# changed are written, each book compare-and-swapped on the version shown.
+def books_table(repo, books):
+    import pandas as pd
+    table = pd.DataFrame(books)
+    editor_key = f"books_editor_{st.session_state.books_editor_run}"
+    st.data_editor(
+        table, key=editor_key, hide_index=True, use_container_width=True,
+        column_order=TABLE_COLUMNS, disabled=["date_added"],
+        column_config={
+            "title": st.column_config.TextColumn("Title", required=True),
+            "author": st.column_config.TextColumn("Author", required=True),
+            "genre": st.column_config.SelectboxColumn("Genre", options=GENRES),
+            "status": st.column_config.SelectboxColumn("Status", options=STATUSES, required=True),
+            "rating": st.column_config.NumberColumn("Rating", min_value=0.0, max_value=5.0, step=0.5),
+            "pages": st.column_config.NumberColumn("Pages", min_value=1, step=1),
+            "publication_year": st.column_config.NumberColumn("Year", min_value=1000,
+                                                              max_value=datetime.now().year, step=1, format="%d"),
+            "isbn": st.column_config.TextColumn("ISBN"),
+            "date_added": st.column_config.TextColumn("Added"),
+        },
+    )
+    
+    edited_rows = st.session_state[editor_key]["edited_rows"]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button(f"💾 Save changes ({len(edited_rows)} book{'s' if len(edited_rows) != 1 else ''})",
+                  on_click=save_table_edits, args=(repo, books, editor_key),
+                  disabled=not edited_rows, use_container_width=True, key="save_table_edits")
+    with col2:
+        st.button("↩️ Discard changes", on_click=discard_table_edits, disabled=not edited_rows,
+                  use_container_width=True, key="discard_table_edits")
+
+def save_table_edits(repo, books, editor_key):
+    edits = []
+    for row, changes in st.session_state[editor_key]["edited_rows"].items():
+        book = books[int(row)]
+        changes = {column: value for column, value in changes.items() if value != getattr(book, column)}
+        for column in ("pages", "publication_year"):
+            if changes.get(column) is not None:
+                changes[column] = int(changes[column])
+        if any(column in changes and not changes[column] for column in ("title", "author")):
+            flash(f"'{book.title}' needs a title and an author; fix it before saving.", "⚠️")
+            return
+        if changes:
+            edits.append((book.id, book.version, changes))
+    
+    conflicts = repo.apply_edits(edits) if edits else []
+    if len(conflicts) < len(edits):
+        request_app_rerun()
+    discard_table_edits()
+    saved = len(edits) - len(conflicts)
+    flash(f"Saved changes to {saved} book{'s' if saved != 1 else ''}.", "✅")
+    if conflicts:
+        flash(f"{len(conflicts)} book{'s were' if len(conflicts) != 1 else ' was'} changed in another "
+              "session and not saved. The table now shows the latest version.", "⚠️")
+
+# A fresh editor key drops the pending edits
+def discard_table_edits():
+    st.session_state.books_editor_run += 1
+
+# Export the filtered books. The file is streamed to a temporary file on
+# the server first, so building it never holds the library in memory. The
+# download button is only drawn by the run that prepared the export: it
+# hands Streamlit a copy of the file, so the temporary file is removed at
+# once and later reruns of the page don't re-read the export.
+def export_section(repo, status, genre):
+    with st.expander("📤 Export these books"):
+        fmt = EXPORT_FORMAT_OPTIONS[st.radio("📄 Format", list(EXPORT_FORMAT_OPTIONS), horizontal=True,
+                                             key="export_format")]
+        
+        if st.button("📦 Prepare Export", use_container_width=True):
+            with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as f:
+                try:
+                    exported = export_books(repo.conn, f, fmt, status, genre)
+                except RuntimeError as e:
+                    st.error(str(e))
+                    exported = None
+            try:
+                if exported is not None:
+                    with open(f.name, "rb") as export_file:
+                        st.download_button(f"⬇️ Download {exported:,} books", export_file, file_name=f"library.{fmt}",
+                                           mime=EXPORT_MIME_TYPES[fmt], use_container_width=True)
+            finally:
+                os.remove(f.name)
+
+# My Books page controls (run as button callbacks, before the rerun)
+def show_next_books_page(next_cursor):
+    st.session_state.books_history.append((st.session_state.books_cursor, st.session_state.books_loaded))
+    st.session_state.books_cursor = next_cursor
+    st.session_state.books_loaded = 1
+
+def show_previous_books_page():
+    st.session_state.books_cursor, st.session_state.books_loaded = st.session_state.books_history.pop()
+
+def load_more_books():
+    st.session_state.books_loaded += 1
+
+# Deleted books stay restorable until the purge job removes them; the
+# latest deletion can be undone from the My Books page
+def undo_banner(repo):
+    deleted = st.session_state.get("undo_delete")
+    if not deleted:
+        return
+    if len(deleted) == 1:
+        message = f"'{deleted[0][1]}' has been deleted from your library."
+    else:
+        message = f"{len(deleted)} books have been deleted from your library."
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        st.info(message)
+    with col2:
+        st.button("↩️ Undo", on_click=undo_delete, args=(repo,), use_container_width=True, key="undo_delete_button")
+
+def toggle_book_selection(book_id):
+    st.session_state.selected_books ^= {book_id}
+
+def clear_book_selection():
+    for book_id in st.session_state.pop("selected_books", set()):
+        st.session_state.pop(f"select_{book_id}", None)
+
+def delete_selected_books(repo):
+    delete_book(repo, sorted(st.session_state.selected_books))
+    clear_book_selection()
+
+def undo_delete(repo):
+    deleted = st.session_state.pop("undo_delete", None)
+    if deleted:
+        restored = repo.restore_books([book_id for book_id, _ in deleted])
+        request_app_rerun()
+        flash(f"Restored {restored} book{'s' if restored != 1 else ''}.", "↩️")
 
 # Add book page
-def add_book(conn):
+def add_book(repo):
     st.markdown('<div class="title">📝 Add New Book</div>', unsafe_allow_html=True)
     
     # Help text
@@ -643,6 +753,39 @@ def add_book(conn):
     </div>
     """, unsafe_allow_html=True)
     
+    add_book_preview()
+    
+    # The remaining details don't change the cover, so they sit in a form
+    # and only reach the server when the book is added
+    _, col2 = st.columns([1, 2])
+    with col2:
+        with st.form("add_book_details", border=False):
+            col1, col3 = st.columns(2)
+            with col1:
+                st.text_input("📘 ISBN", key="add_isbn", help="International Standard Book Number (optional)")
+                st.number_input("📅 Publication Year", min_value=1000, max_value=datetime.now().year, step=1,
+                                key="add_year", help="Year when the book was published")
+            with col3:
+                st.number_input("📄 Pages", min_value=1, step=1, key="add_pages", help="Total number of pages in the book")
+                st.slider("⭐ Rating", 0.0, 5.0, 0.0, 0.5, key="add_rating", help="Your rating from 0 to 5 stars")
+            
+            st.selectbox("📊 Status", ["To Read", "Reading", "Completed", "DNF"], key="add_status",
+                         help="Current reading status (DNF = Did Not Finish)")
+            st.text_area("📝 Notes", key="add_notes", help="Your personal notes about this book")
+            
+            st.form_submit_button("➕ Add Book", use_container_width=True, on_click=save_new_book, args=(repo,))
+        
+        # Success animation for the book just added
+        if st.session_state.pop("book_added", False):
+            show_lottie("success", speed=1, height=200, key="success")
+    
+    bulk_import(repo)
+
+# Cover preview with the fields it is drawn from. A fragment, so typing a
+# title or author reruns just the preview instead of the whole page.
+@st.fragment
+@profiled("fragment:Cover Preview")
+def add_book_preview():
     col1, col2 = st.columns([1, 2])
     
     # Book details for preview
@@ -662,122 +805,143 @@ def add_book(conn):
             genre_preview = st.session_state.preview_genre
             
         st.markdown(generate_book_cover_html(title_preview, author_preview, genre_preview), unsafe_allow_html=True)
-        st.markdown("<p style='text-align: center; font-size: 0.9rem; margin-top: 10px;'>Cover preview updates as you type</p>", unsafe_allow_html=True)
+        st.markdown('<p class="preview-caption">Cover preview updates as you type</p>', unsafe_allow_html=True)
     
     with col2:
         # Update preview as user types
-        title = st.text_input("📕 Title*", key="preview_title", value=title_preview if title_preview != "Book Title" else "", 
-                             help="Enter the full title of the book")
-        author = st.text_input("✍️ Author*", key="preview_author", value=author_preview if author_preview != "Author Name" else "",
-                              help="Enter the author's full name")
-        genre = st.selectbox("🏷️ Genre", ["Fiction", "Non-Fiction", "Science Fiction", "Fantasy", 
+        st.text_input("📕 Title*", key="preview_title", value=title_preview if title_preview != "Book Title" else "",
+                      help="Enter the full title of the book")
+        st.text_input("✍️ Author*", key="preview_author", value=author_preview if author_preview != "Author Name" else "",
+                      help="Enter the author's full name")
+        st.selectbox("🏷️ Genre", ["Fiction", "Non-Fiction", "Science Fiction", "Fantasy", 
                                       "Mystery", "Thriller", "Romance", "Biography", "History", 
                                       "Self-Help", "Business", "Science", "Other"], key="preview_genre",
                             help="Select the book's primary genre")
+
+ADD_BOOK_WIDGETS = ["preview_title", "preview_author", "preview_genre", "add_isbn", "add_year", "add_pages",
+                    "add_rating", "add_status", "add_notes"]
+
+# Insert the new book (run as a button callback) and clear the form for the next one
+def save_new_book(repo):
+    values = tuple(st.session_state[key] for key in ADD_BOOK_WIDGETS)
+    if not values[0] or not values[1]:
+        flash("Title and author are required fields.", "⚠️")
+        return
+    
+    repo.add_book(values)
+    for key in ADD_BOOK_WIDGETS:
+        del st.session_state[key]
+    st.session_state.book_added = True
+    flash(f"'{values[0]}' has been added to your library!", "🎉")
+
+# Bulk import section of the Add Book page
+def bulk_import(repo):
+    with st.expander("📥 Bulk Import (CSV or JSON Lines)"):
+        st.markdown("""
+        Import many books at once. Use the column names `title`, `author`, `genre`, `isbn`,
+        `publication_year`, `pages`, `rating`, `status`, `date_added` and `notes`
+        (only title and author are required). `genre` must be one of the genres in the form above and
+        `date_added` an ISO date such as 2024-05-06. For very large catalogs you can also run
+        `python cli.py import books.csv` on the server.
+        """)
+        uploaded = st.file_uploader("📄 Choose a file", type=["csv", "jsonl", "ndjson"], key="import_file")
+        dedupe_label = st.radio("🔁 Skip duplicates", list(IMPORT_DEDUPE_OPTIONS), horizontal=True,
+                                help="Books already in your library (or repeated in the file) are skipped")
         
-        col1, col2 = st.columns(2)
-        with col1:
-            isbn = st.text_input("📘 ISBN", help="International Standard Book Number (optional)")
-            publication_year = st.number_input("📅 Publication Year", min_value=1000, max_value=datetime.now().year, step=1,
-                                             help="Year when the book was published")
-        with col2:
-            pages = st.number_input("📄 Pages", min_value=1, step=1, help="Total number of pages in the book")
-            rating = st.slider("⭐ Rating", 0.0, 5.0, 0.0, 0.5, help="Your rating from 0 to 5 stars")
-        
-        status = st.selectbox("📊 Status", ["To Read", "Reading", "Completed", "DNF"], 
-                             help="Current reading status (DNF = Did Not Finish)")
-        notes = st.text_area("📝 Notes", help="Your personal notes about this book")
-        
-        if st.button("➕ Add Book", use_container_width=True):
-            if not title or not author:
-                st.error("Title and author are required fields.")
-            else:
-                c = conn.cursor()
-                c.execute("""
-                INSERT INTO books (title, author, genre, isbn, publication_year, pages, rating, status, date_added, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (title, author, genre, isbn, publication_year, pages, rating, status, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), notes))
-                conn.commit()
-                
-                # Success animation
-                success_lottie = load_lottie_url("https://assets9.lottiefiles.com/packages/lf20_jbrw3hcz.json")
-                if success_lottie:
-                    st_lottie(success_lottie, speed=1, height=200, key="success")
-                
-                st.success(f"'{title}' has been added to your library!")
-                time.sleep(2)
-                st.rerun()
+        if uploaded is not None and st.button("📥 Import Books", use_container_width=True):
+            fmt = "csv" if uploaded.name.lower().endswith(".csv") else "jsonl"
+            progress = st.empty()
+            report = import_books(
+                repo.conn, iter_rows(uploaded, fmt), dedupe=IMPORT_DEDUPE_OPTIONS[dedupe_label],
+                progress=lambda r: progress.info(f"Imported {r.inserted:,} books so far..."),
+            )
+            progress.empty()
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Imported", f"{report.inserted:,}")
+            col2.metric("Duplicates", f"{report.duplicates:,}")
+            col3.metric("Rejected", f"{report.failed:,}")
+            col4.metric("Rows / second", f"{report.rows_per_second:,.0f}")
+            
+            if report.inserted:
+                st.success(f"Imported {report.inserted:,} books in {report.elapsed:.2f} seconds.")
+            if report.errors:
+                import pandas as pd
+                st.warning(f"{report.failed:,} rows could not be imported.")
+                st.dataframe(pd.DataFrame(report.errors, columns=["Line", "Problem"]),
+                             hide_index=True, use_container_width=True)
 
 # Search books page
-def search_books(conn):
+def search_books(repo):
     st.markdown('<div class="title">🔍 Search Books</div>', unsafe_allow_html=True)
     
     # Help text
     st.markdown("""
     <div class="help-text">
-        <strong>🔍 Search Books</strong>: Find books in your library by title, author, or genre.
-        Enter your search term below to get started.
+        <strong>🔍 Search Books</strong>: Find books in your library by title, author, genre, notes, or ISBN.
+        Enter your search term below to get started. Use "quotes" for an exact phrase and * for word beginnings.
     </div>
     """, unsafe_allow_html=True)
     
-    search_term = st.text_input("🔍 Search by title, author, or genre", help="Enter any part of the title, author name, or genre")
+    search_term = st.text_input("🔍 Search by title, author, genre, notes, or ISBN",
+                                help='Enter words from the title, author, genre, notes or ISBN. "Exact phrase" and prefix* searches are supported')
     
     if search_term:
-        c = conn.cursor()
-        search_results = c.execute("""
-        SELECT * FROM books 
-        WHERE title LIKE ? OR author LIKE ? OR genre LIKE ?
-        """, (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%")).fetchall()
+        search_results, total_results = repo.search(search_term, limit=SEARCH_RESULT_LIMIT)
         
         if search_results:
-            st.markdown(f"Found {len(search_results)} results for '{search_term}'")
+            if total_results > len(search_results):
+                st.markdown(f"Found {total_results} results for '{search_term}' (showing the best {len(search_results)})")
+            else:
+                st.markdown(f"Found {total_results} results for '{search_term}'")
             
             for book in search_results:
                 col1, col2, col3 = st.columns([1, 3, 1])
                 with col1:
                     # Dynamic book cover
-                    st.markdown(generate_book_cover_html(book[1], book[2], book[3]), unsafe_allow_html=True)
+                    st.markdown(generate_book_cover_html(book.title, book.author, book.genre), unsafe_allow_html=True)
                 with col2:
-                    st.markdown(f"**{book[1]}**")
-                    st.markdown(f"By {book[2]}")
-                    st.markdown(f"Genre: {book[3]}")
-                    if book[7]:  # rating
-                        st.markdown(f"Rating: {'⭐' * int(book[7])}")
+                    st.markdown(f"**{book.title}**")
+                    st.markdown(f"By {book.author}")
+                    st.markdown(f"Genre: {book.genre}")
+                    if book.rating:
+                        st.markdown(f"Rating: {'⭐' * int(book.rating)}")
+                    st.caption(book.snippet)  # highlighted match
                 with col3:
-                    st.markdown(get_status_badge(book[8]), unsafe_allow_html=True)
-                    if st.button("👁️ View Details", key=f"view_{book[0]}", help="See complete book details"):
-                        st.session_state.view_book_id = book[0]
+                    st.markdown(get_status_badge(book.status), unsafe_allow_html=True)
+                    if st.button("👁️ View Details", key=f"view_{book.id}", help="See complete book details"):
+                        st.session_state.view_book_id = book.id
                 st.markdown("---")
                 
                 # Show book details if requested
-                if hasattr(st.session_state, 'view_book_id') and st.session_state.view_book_id == book[0]:
+                if hasattr(st.session_state, 'view_book_id') and st.session_state.view_book_id == book.id:
                     with st.expander("Book Details", expanded=True):
                         col1, col2 = st.columns([1, 2])
                         with col1:
                             # Dynamic book cover
-                            st.markdown(generate_book_cover_html(book[1], book[2], book[3]), unsafe_allow_html=True)
+                            st.markdown(generate_book_cover_html(book.title, book.author, book.genre), unsafe_allow_html=True)
                         with col2:
-                            st.markdown(f"**Title:** {book[1]}")
-                            st.markdown(f"**Author:** {book[2]}")
-                            st.markdown(f"**Genre:** {book[3]}")
-                            st.markdown(f"**ISBN:** {book[4] or 'N/A'}")
-                            st.markdown(f"**Publication Year:** {book[5] or 'N/A'}")
-                            st.markdown(f"**Pages:** {book[6] or 'N/A'}")
-                            st.markdown(f"**Rating:** {book[7] or 'Not rated'}")
-                            st.markdown(f"**Status:** {book[8]}")
-                            st.markdown(f"**Date Added:** {book[9]}")
-                            st.markdown(f"**Notes:** {book[10] or 'No notes'}")
+                            st.markdown(f"**Title:** {book.title}")
+                            st.markdown(f"**Author:** {book.author}")
+                            st.markdown(f"**Genre:** {book.genre}")
+                            st.markdown(f"**ISBN:** {book.isbn or 'N/A'}")
+                            st.markdown(f"**Publication Year:** {book.publication_year or 'N/A'}")
+                            st.markdown(f"**Pages:** {book.pages or 'N/A'}")
+                            st.markdown(f"**Rating:** {book.rating or 'Not rated'}")
+                            st.markdown(f"**Status:** {book.status}")
+                            st.markdown(f"**Date Added:** {book.date_added}")
+                            st.markdown(f"**Notes:** {book.notes or 'No notes'}")
         else:
             st.info(f"No books found matching '{search_term}'")
     else:
         # Lottie animation
-        search_lottie = load_lottie_url("https://assets3.lottiefiles.com/packages/lf20_t9gkkhz4.json")
-        if search_lottie:
-            st_lottie(search_lottie, speed=1, height=300, key="search_animation")
+        show_lottie("search", speed=1, height=300, key="search_animation")
         st.markdown("<div style='text-align: center;'>Enter a search term to find books in your library</div>", unsafe_allow_html=True)
 
 # Statistics page
-def display_statistics(conn):
+def display_statistics(repo):
+    import plotly.express as px
+    
     st.markdown('<div class="title">📊 Library Statistics</div>', unsafe_allow_html=True)
     
     # Help text
@@ -788,171 +952,201 @@ def display_statistics(conn):
     </div>
     """, unsafe_allow_html=True)
     
-    c = conn.cursor()
-    
-    # Get basic stats
-    total_books = c.execute("SELECT COUNT(*) FROM books").fetchone()[0]
-    total_pages = c.execute("SELECT SUM(pages) FROM books").fetchone()[0] or 0
-    avg_rating = c.execute("SELECT AVG(rating) FROM books WHERE rating > 0").fetchone()[0] or 0
+    # Every chart below is grouped from the library snapshot
+    stats, analytics = statistics_cached(repo)
     
     # Create metrics
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.markdown("""
-        <div class="dashboard-card">
-            <div style="font-size: 2.5rem; text-align: center; color: #4f8bf9; font-weight: bold;">
-                📚 {}
-            </div>
-            <div style="text-align: center; margin-top: 0.5rem; font-size: 1.2rem;">
-                Total Books
-            </div>
-        </div>
-        """.format(total_books), unsafe_allow_html=True)
+        st.markdown(f'<div class="dashboard-card"><div class="metric-value">📚 {stats["books"]}</div>'
+                    '<div class="metric-label">Total Books</div></div>', unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
-        <div class="dashboard-card">
-            <div style="font-size: 2.5rem; text-align: center; color: #4f8bf9; font-weight: bold;">
-                📄 {:,}
-            </div>
-            <div style="text-align: center; margin-top: 0.5rem; font-size: 1.2rem;">
-                Total Pages
-            </div>
-        </div>
-        """.format(total_pages), unsafe_allow_html=True)
+        st.markdown(f'<div class="dashboard-card"><div class="metric-value">📄 {stats["pages"]:,}</div>'
+                    '<div class="metric-label">Total Pages</div></div>', unsafe_allow_html=True)
     
     with col3:
-        st.markdown("""
-        <div class="dashboard-card">
-            <div style="font-size: 2.5rem; text-align: center; color: #4f8bf9; font-weight: bold;">
-                ⭐ {:.1f}
-            </div>
-            <div style="text-align: center; margin-top: 0.5rem; font-size: 1.2rem;">
-                Average Rating
-            </div>
-        </div>
-        """.format(avg_rating), unsafe_allow_html=True)
+        st.markdown(f'<div class="dashboard-card"><div class="metric-value">⭐ {stats["average_rating"]:.1f}</div>'
+                    '<div class="metric-label">Average Rating</div></div>', unsafe_allow_html=True)
     
     # Reading status distribution
-    st.markdown("""
-    <div class="dashboard-card-title">
-        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <rect x="3" y="3" width="18" height="18" rx="2" ry="2"></rect>
-            <line x1="3" y1="9" x2="21" y2="9"></line>
-            <line x1="9" y1="21" x2="9" y2="9"></line>
-        </svg>
-        Reading Status Distribution
-    </div>
-    """, unsafe_allow_html=True)
+    section_title("layout", "Reading Status Distribution")
     
-    status_data = c.execute("""
-    SELECT status, COUNT(*) as count FROM books GROUP BY status ORDER BY count DESC
-    """).fetchall()
+    status_df = stats["status"]
     
-    if status_data:
-        status_df = pd.DataFrame(status_data, columns=["Status", "Count"])
-        fig = px.bar(status_df, x="Status", y="Count", color="Status", 
-                    color_discrete_sequence=px.colors.qualitative.Pastel)
-        fig.update_layout(
-            margin=dict(l=20, r=20, t=30, b=20),
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-        )
-        st.plotly_chart(fig, use_container_width=True)
+    if not status_df.empty:
+        with timed("plotly"):
+            fig = px.bar(status_df, x="Status", y="Count", color="Status", 
+                        color_discrete_sequence=px.colors.qualitative.Pastel)
+            fig.update_layout(
+                margin=dict(l=20, r=20, t=30, b=20),
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+            )
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("Add some books to see reading status distribution!")
     
     # Books added over time
-    st.markdown("""
-    <div class="dashboard-card-title">
-        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <line x1="12" y1="20" x2="12" y2="10"></line>
-            <line x1="18" y1="20" x2="18" y2="4"></line>
-            <line x1="6" y1="20" x2="6" y2="16"></line>
-        </svg>
-        Books Added Over Time
-    </div>
-    """, unsafe_allow_html=True)
+    section_title("bar-chart", "Books Added Over Time")
     
-    timeline_data = c.execute("""
-    SELECT substr(date_added, 1, 7) as month, COUNT(*) as count 
-    FROM books 
-    GROUP BY month 
-    ORDER BY month
-    """).fetchall()
+    timeline_df = stats["timeline"]
     
-    if timeline_data:
-        timeline_df = pd.DataFrame(timeline_data, columns=["Month", "Books Added"])
-        fig = px.line(timeline_df, x="Month", y="Books Added", markers=True)
-        fig.update_layout(
-            margin=dict(l=20, r=20, t=30, b=20),
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-        )
-        st.plotly_chart(fig, use_container_width=True)
+    if not timeline_df.empty:
+        with timed("plotly"):
+            fig = px.line(timeline_df, x="Month", y="Books Added", markers=True)
+            fig.update_layout(
+                margin=dict(l=20, r=20, t=30, b=20),
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+            )
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("Add some books to see your reading timeline!")
     
+    display_reading_pace(analytics)
+    
     # Top genres and authors
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown("""
-        <div class="dashboard-card-title">
-            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                <path d="M21.21 15.89A10 10 0 1 1 8 2.83"></path>
-                <path d="M22 12A10 10 0 0 0 12 2v10z"></path>
-            </svg>
-            Top Genres
-        </div>
-        """, unsafe_allow_html=True)
+        section_title("pie-chart", "Top Genres")
         
-        genre_data = c.execute("""
-        SELECT genre, COUNT(*) as count FROM books GROUP BY genre ORDER BY count DESC LIMIT 5
-        """).fetchall()
+        genre_df = stats["genres"]
         
-        if genre_data:
-            genre_df = pd.DataFrame(genre_data, columns=["Genre", "Count"])
-            fig = px.pie(genre_df, values="Count", names="Genre", hole=0.4)
-            fig.update_layout(
-                margin=dict(l=20, r=20, t=30, b=20),
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)",
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if not genre_df.empty:
+            with timed("plotly"):
+                fig = px.pie(genre_df, values="Count", names="Genre", hole=0.4)
+                fig.update_layout(
+                    margin=dict(l=20, r=20, t=30, b=20),
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    plot_bgcolor="rgba(0,0,0,0)",
+                )
+                st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Add some books to see your top genres!")
     
     with col2:
-        st.markdown("""
-        <div class="dashboard-card-title">
-            <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                <path d="M17 21v-2a4 4 0 0 0-4-4H5a4 4 0 0 0-4 4v2"></path>
-                <circle cx="9" cy="7" r="4"></circle>
-                <path d="M23 21v-2a4 4 0 0 0-3-3.87"></path>
-                <path d="M16 3.13a4 4 0 0 1 0 7.75"></path>
-            </svg>
-            Top Authors
-        </div>
-        """, unsafe_allow_html=True)
+        section_title("users", "Top Authors")
         
-        author_data = c.execute("""
-        SELECT author, COUNT(*) as count FROM books GROUP BY author ORDER BY count DESC LIMIT 5
-        """).fetchall()
+        author_df = stats["authors"]
         
-        if author_data:
-            author_df = pd.DataFrame(author_data, columns=["Author", "Books"])
-            fig = px.bar(author_df, x="Author", y="Books", color="Books",
-                        color_continuous_scale=px.colors.sequential.Viridis)
-            fig.update_layout(
-                margin=dict(l=20, r=20, t=30, b=20),
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)",
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if not author_df.empty:
+            with timed("plotly"):
+                fig = px.bar(author_df, x="Author", y="Books", color="Books",
+                            color_continuous_scale=px.colors.sequential.Viridis)
+                fig.update_layout(
+                    margin=dict(l=20, r=20, t=30, b=20),
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    plot_bgcolor="rgba(0,0,0,0)",
+                )
+                st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Add some books to see your favorite authors!")
 
+# Reading pace section of the Statistics page
+def display_reading_pace(analytics):
+    import plotly.express as px
+    section_title("activity", "Reading Pace")
+    
+    timeline = analytics["timeline"]
+    if timeline.empty:
+        st.info("Save your progress on the Dashboard to see your reading pace!")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Pages per Day (30 days)", f"{analytics['pages_per_day']:.1f}")
+    col2.metric("Current Streak", f"{analytics['current_streak']} days")
+    col3.metric("Longest Streak", f"{analytics['longest_streak']} days")
+    
+    with timed("plotly"):
+        fig = px.line(timeline, y=list(timeline.columns), labels={"date": "Day", "value": "Pages", "variable": ""})
+        fig.update_layout(
+            margin=dict(l=20, r=20, t=30, b=20),
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="rgba(0,0,0,0)",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Completion Rate by Genre**")
+        completion = analytics["completion"]
+        if not completion.empty:
+            with timed("plotly"):
+                fig = px.bar(completion, x="Genre", y="Completion Rate", hover_data=["Started", "Completed"],
+                             color_discrete_sequence=px.colors.qualitative.Pastel)
+                fig.update_layout(
+                    margin=dict(l=20, r=20, t=30, b=20),
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    yaxis_tickformat=".0%",
+                )
+                st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("Start some books to see how many you finish!")
+    with col2:
+        st.markdown("**Expected Finish Dates**")
+        forecast = analytics["forecast"]
+        if not forecast.empty:
+            st.dataframe(forecast, hide_index=True, use_container_width=True,
+                         column_config={"Percent": st.column_config.ProgressColumn("Progress", format="%.0f%%",
+                                                                                   min_value=0, max_value=100),
+                                        "Expected Finish": st.column_config.DateColumn(format="MMM D, YYYY")})
+        else:
+            st.info("Books you are reading will appear here with a finish date.")
+
+# Performance page: where the server's time goes, across all sessions and
+# libraries of this process, from the timings and query log in profiling.py
+def display_performance():
+    st.markdown('<div class="title">⏱️ Performance</div>', unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="help-text">
+        <strong>⏱️ Performance</strong>: Server-side timings of every page and fragment, and the SQL
+        statements behind them. Percentiles cover the most recent runs of each section.
+    </div>
+    """, unsafe_allow_html=True)
+    
+    import pandas as pd
+    
+    section_title("clock", "Page Timings")
+    timings = timing_summary()
+    if timings:
+        st.dataframe(pd.DataFrame(
+            [(name, runs, p50 * 1000, p95 * 1000, slowest * 1000) for name, runs, p50, p95, slowest in timings],
+            columns=["Section", "Runs", "p50 (ms)", "p95 (ms)", "Max (ms)"],
+        ).round(2), hide_index=True, use_container_width=True)
+    else:
+        st.info("No timings recorded yet.")
+    
+    section_title("activity", "Slowest Queries")
+    slowest = slowest_queries()
+    if slowest:
+        st.dataframe(pd.DataFrame(
+            [(sql, seconds * 1000, rows, datetime.fromtimestamp(started_at).strftime("%H:%M:%S"))
+             for sql, seconds, rows, started_at in slowest],
+            columns=["SQL", "Time (ms)", "Rows", "At"],
+        ).round(2), hide_index=True, use_container_width=True)
+        
+        section_title("layout", "Queries by Total Time")
+        st.dataframe(pd.DataFrame(
+            [(sql, runs, total * 1000, p50 * 1000, p95 * 1000, rows)
+             for sql, runs, total, p50, p95, rows in query_summary()],
+            columns=["SQL", "Runs", "Total (ms)", "p50 (ms)", "p95 (ms)", "Avg Rows"],
+        ).round(2), hide_index=True, use_container_width=True)
+    else:
+        st.info("No queries logged yet.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ Prometheus Metrics", prometheus_text(), file_name="library.prom",
+                           mime="text/plain", use_container_width=True)
+    with col2:
+        st.button("🧹 Reset", on_click=reset_profiling, use_container_width=True, key="reset_profiling")
+    if METRICS_FILE:
+        st.caption(f"Metrics are also written to {METRICS_FILE} after every run.")
+
 # Help and tips page
 def display_help():
     st.markdown('<div class="title">❓ Help & Tips</div>', unsafe_allow_html=True)
@@ -968,16 +1162,7 @@ def display_help():
     """, unsafe_allow_html=True)
     
     # App overview
-    st.markdown("""
-    <div class="dashboard-card-title">
-        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <circle cx="12" cy="12" r="10"></circle>
-            <line x1="12" y1="16" x2="12" y2="12"></line>
-            <line x1="12" y1="8" x2="12.01" y2="8"></line>
-        </svg>
-        App Overview
-    </div>
-    """, unsafe_allow_html=True)
+    section_title("info", "App Overview")
     
     st.markdown("""
     The Personal Library Manager helps you track and organize your books. Key features include:
@@ -985,23 +1170,13 @@ def display_help():
     - **Dashboard**: Get an overview of your library and recent activity
     - **My Books**: View and manage all books in your collection
     - **Add Book**: Add new books to your library
-    - **Search**: Find specific books by title, author, or genre
+    - **Search**: Find specific books by title, author, genre, or notes
     - **Statistics**: Visualize your reading habits and preferences
+    - **Performance**: See how long each page and database query takes on the server
     """)
     
     # How to use
-    st.markdown("""
-    <div class="dashboard-card-title">
-        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z"></path>
-            <polyline points="14 2 14 8 20 8"></polyline>
-            <line x1="16" y1="13" x2="8" y2="13"></line>
-            <line x1="16" y1="17" x2="8" y2="17"></line>
-            <polyline points="10 9 9 9 8 9"></polyline>
-        </svg>
-        How to Use
-    </div>
-    """, unsafe_allow_html=True)
+    section_title("file-text", "How to Use")
     
     with st.expander("📚 Adding a New Book"):
         st.markdown("""
@@ -1025,13 +1200,14 @@ def display_help():
         
         **Using Search:**
         1. Go to "Search" in the sidebar
-        2. Enter any part of the title, author name, or genre
-        3. The app will show all matching books
-        4. Click "View Details" to see complete information about a book
+        2. Enter words from the title, author name, genre, notes, or ISBN
+        3. The app will show matching books, best matches first
+        4. Put words in "quotes" to find an exact phrase, or end a word with * to match its beginning
+        5. Click "View Details" to see complete information about a book
         """)
     
     with st.expander("✏️ Editing and Deleting Books"):
-        st.markdown("""
+        st.markdown(f"""
         **To edit a book:**
         1. Find the book in "My Books" or through "Search"
         2. Click the "Edit" button below the book
@@ -1040,8 +1216,13 @@ def display_help():
         
         **To delete a book:**
         1. Find the book in "My Books" or through "Search"
-        2. Click the "Delete" button below the book
-        3. The book will be permanently removed from your library
+        2. Click the "Delete" button below the book, or tick the boxes of several books and click "Delete selected"
+        3. Click "Undo" to bring back books you deleted by mistake
+        4. Deleted books are permanently removed after {PURGE_RETENTION_DAYS} days
+        
+        **To change many books at once:**
+        - Tick the boxes of the books, pick a status, genre or rating and click "Apply to selected"
+        - Or switch "My Books" to the Table view, edit the cells and click "Save changes"
         """)
     
     with st.expander("📊 Understanding Statistics"):
@@ -1051,6 +1232,7 @@ def display_help():
         - **Basic Metrics**: Total books, pages read, and average rating
         - **Reading Status**: Distribution of books by reading status
         - **Timeline**: Books added over time
+        - **Reading Pace**: Pages read per day, reading streaks, completion rate by genre and expected finish dates
         - **Top Genres**: Your most common book genres
         - **Top Authors**: Authors with the most books in your library
         
@@ -1058,31 +1240,18 @@ def display_help():
         """)
     
     # Tips and tricks
-    st.markdown("""
-    <div class="dashboard-card-title">
-        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <polygon points="12 2 15.09 8.26 22 9.27 17 14.14 18.18 21.02 12 17.77 5.82 21.02 7 14.14 2 9.27 8.91 8.26 12 2"></polygon>
-        </svg>
-        Tips and Tricks
-    </div>
-    """, unsafe_allow_html=True)
+    section_title("star", "Tips and Tricks")
     
     st.markdown("""
     - **Book Covers**: The app generates unique covers based on book titles and genres
-    - **Reading Progress**: Track your reading progress for books with the "Reading" status
+    - **Reading Progress**: Move the page sliders on the Dashboard and click "Save Progress" for books with the "Reading" status
     - **Notes**: Use the Notes field to record your thoughts, favorite quotes, or reading dates
     - **Filtering**: Combine status and genre filters to find specific books quickly
+    - **Bulk Import**: Bring in a whole catalog from a CSV or JSON Lines file on the Add Book page
     """)
     
     # Contact and feedback
-    st.markdown("""
-    <div class="dashboard-card-title">
-        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <path d="M21 11.5a8.38 8.38 0 0 1-.9 3.8 8.5 8.5 0 0 1-7.6 4.7 8.38 8.38 0 0 1-3.8-.9L3 21l1.9-5.7a8.38 8.38 0 0 1-.9-3.8 8.5 8.5 0 0 1 4.7-7.6 8.38 8.38 0 0 1 3.8-.9h.5a8.48 8.48 0 0 1 8 8v.5z"></path>
-        </svg>
-        Feedback
-    </div>
-    """, unsafe_allow_html=True)
+    section_title("message-circle", "Feedback")
     
     st.markdown("""
     We're constantly improving the Library Manager app. If you have suggestions or encounter any issues, please let us know!
@@ -1091,75 +1260,101 @@ def display_help():
     """)
 
 # Helper functions
-def edit_book_modal(conn, book_id):
-    c = conn.cursor()
-    book = c.execute("SELECT * FROM books WHERE id = ?", (book_id,)).fetchone()
+def edit_book_modal(repo, book_id):
+    book = repo.get_book(book_id)
     
     if not book:
-        st.error("Book not found!")
+        st.error("Book not found! It may have been deleted in another session.")
+        close_edit_modal()
         return
     
+    # Edits start from the version of the book the user opened; if the stored
+    # version moves on meanwhile, another session has changed it
+    base = st.session_state.get("edit_book_base")
+    if base is None or base.id != book_id:
+        base = st.session_state.edit_book_base = book
+    
     st.markdown('<div class="subtitle">✏️ Edit Book</div>', unsafe_allow_html=True)
     
+    if book.version != base.version:
+        changed = [column.replace("_", " ") for column in EDITABLE_COLUMNS
+                   if getattr(book, column) != getattr(base, column)]
+        st.warning(f"⚠️ This book was changed in another session while you were editing "
+                   f"({', '.join(changed) or 'no visible fields'}). Load the latest version, or overwrite it with your changes.")
+    
     col1, col2 = st.columns([1, 2])
     
     with col1:
         # Dynamic book cover
-        st.markdown(generate_book_cover_html(book[1], book[2], book[3]), unsafe_allow_html=True)
-    
-    with col2:
-        # Update preview as user types
-        title = st.text_input("📕 Title*", value=book[1], key=f"edit_title_{book[0]}")
-        author = st.text_input("✍️ Author*", value=book[2], key=f"edit_author_{book[0]}")
-        genre = st.selectbox("🏷️ Genre", ["Fiction", "Non-Fiction", "Science Fiction", "Fantasy", 
-                                      "Mystery", "Thriller", "Romance", "Biography", "History", 
-                                      "Self-Help", "Business", "Science", "Other"], 
-                            index=0 if not book[3] else ["Fiction", "Non-Fiction", "Science Fiction", "Fantasy", 
-                                                        "Mystery", "Thriller", "Romance", "Biography", "History", 
-                                                        "Self-Help", "Business", "Science", "Other"].index(book[3]),
-                            key=f"edit_genre_{book[0]}")
+        st.markdown(generate_book_cover_html(base.title, base.author, base.genre), unsafe_allow_html=True)
+    
+    # A form: nothing is sent to the server until one of its buttons is clicked
+    with col2, st.form(f"edit_book_{book_id}", border=False):
+        st.text_input("📕 Title*", value=base.title, key=f"edit_title_{book_id}")
+        st.text_input("✍️ Author*", value=base.author, key=f"edit_author_{book_id}")
+        st.selectbox("🏷️ Genre", GENRES, index=GENRES.index(base.genre) if base.genre in GENRES else 0,
+                     key=f"edit_genre_{book_id}")
         
         col1, col2 = st.columns(2)
         with col1:
-            isbn = st.text_input("📘 ISBN", value=book[4] or "")
-            publication_year = st.number_input("📅 Publication Year", min_value=1000, max_value=datetime.now().year, step=1, value=book[5] or 2000)
+            st.text_input("📘 ISBN", value=base.isbn or "", key=f"edit_isbn_{book_id}")
+            st.number_input("📅 Publication Year", min_value=1000, max_value=datetime.now().year, step=1,
+                            value=base.publication_year or 2000, key=f"edit_year_{book_id}")
         with col2:
-            pages = st.number_input("📄 Pages", min_value=1, step=1, value=book[6] or 1)
-            rating = st.slider("⭐ Rating", 0.0, 5.0, float(book[7] or 0.0), 0.5)
+            st.number_input("📄 Pages", min_value=1, step=1, value=base.pages or 1, key=f"edit_pages_{book_id}")
+            st.slider("⭐ Rating", 0.0, 5.0, float(base.rating or 0.0), 0.5, key=f"edit_rating_{book_id}")
         
-        status = st.selectbox("📊 Status", ["To Read", "Reading", "Completed", "DNF"], index=["To Read", "Reading", "Completed", "DNF"].index(book[8]))
-        notes = st.text_area("📝 Notes", value=book[10] or "")
+        st.selectbox("📊 Status", STATUSES, index=STATUSES.index(base.status) if base.status in STATUSES else 0,
+                     key=f"edit_status_{book_id}")
+        st.text_area("📝 Notes", value=base.notes or "", key=f"edit_notes_{book_id}")
         
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("💾 Update Book", use_container_width=True):
-                if not title or not author:
-                    st.error("Title and author are required fields.")
-                else:
-                    c.execute("""
-                    UPDATE books SET 
-                    title = ?, author = ?, genre = ?, isbn = ?, publication_year = ?, 
-                    pages = ?, rating = ?, status = ?, notes = ?
-                    WHERE id = ?
-                    """, (title, author, genre, isbn, publication_year, pages, rating, status, notes, book_id))
-                    conn.commit()
-                    st.success(f"'{title}' has been updated!")
-                    time.sleep(1)
-                    del st.session_state.edit_book_id
-                    st.rerun()
+            st.form_submit_button("💾 Update Book" if book.version == base.version else "💾 Overwrite",
+                                  use_container_width=True, on_click=save_book_edits,
+                                  args=(repo, book_id, book.version))
         with col2:
-            if st.button("❌ Cancel", use_container_width=True):
-                del st.session_state.edit_book_id
-                st.rerun()
-
-def delete_book(conn, book_id):
-    c = conn.cursor()
-    book = c.execute("SELECT title FROM books WHERE id = ?", (book_id,)).fetchone()
-    
-    if book:
-        c.execute("DELETE FROM books WHERE id = ?", (book_id,))
-        conn.commit()
-        st.success(f"'{book[0]}' has been deleted from your library!")
+            if book.version != base.version:
+                st.form_submit_button("🔄 Load Latest", use_container_width=True,
+                                      on_click=load_latest_book, args=(book,))
+            else:
+                st.form_submit_button("❌ Cancel", use_container_width=True, on_click=close_edit_modal)
+
+# Save the edit form (run as a button callback). If the book changed again
+# since this form was drawn, the write is refused and the rerun shows the conflict.
+def save_book_edits(repo, book_id, version):
+    values = tuple(st.session_state[f"edit_{name}_{book_id}"] for name in EDIT_WIDGETS)
+    if not values[0] or not values[1]:
+        flash("Title and author are required fields.", "⚠️")
+    elif repo.update_book(book_id, version, values) is not None:
+        flash(f"'{values[0]}' has been updated!", "✅")
+        close_edit_modal()
+        request_app_rerun()
+
+def load_latest_book(book):
+    reset_edit_widgets(book.id)
+    st.session_state.edit_book_base = book
+
+EDIT_WIDGETS = ["title", "author", "genre", "isbn", "year", "pages", "rating", "status", "notes"]
+
+def reset_edit_widgets(book_id):
+    for name in EDIT_WIDGETS:
+        st.session_state.pop(f"edit_{name}_{book_id}", None)
+
+def close_edit_modal():
+    book_id = st.session_state.pop("edit_book_id", None)
+    st.session_state.pop("edit_book_base", None)
+    if book_id is not None:
+        reset_edit_widgets(book_id)
+
+# Soft-delete books (run as a button callback); the deletion can be undone
+# until the next one replaces it
+def delete_book(repo, book_ids):
+    deleted = repo.delete_books(book_ids)
+    st.session_state.get("selected_books", set()).difference_update(book_ids)
+    if deleted:
+        st.session_state.undo_delete = deleted
+        request_app_rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+import time
+
+from profiling import profiled
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "lottie")
+
+# Animations used by the app: name -> source URL
+LOTTIE_ANIMATIONS = {
+    "book": "https://assets5.lottiefiles.com/packages/lf20_1cazwtnc.json",
+    "success": "https://assets9.lottiefiles.com/packages/lf20_jbrw3hcz.json",
+    "search": "https://assets3.lottiefiles.com/packages/lf20_t9gkkhz4.json",
+}
+
+FETCH_TIMEOUT = (2, 5)  # seconds to connect, seconds to read
+REFRESH_AFTER = 7 * 24 * 60 * 60  # re-download cached files older than a week
+RETRY_AFTER = 5 * 60  # wait before retrying a failed download
+
+_lock = threading.Lock()
+_loaded = {}  # name -> (animation JSON, time it was fetched)
+_fetching = set()
+_failed_at = {}
+
+
+def _asset_path(name):
+    return os.path.join(ASSET_DIR, f"{name}.json")
+
+
+def _read_asset(name):
+    path = _asset_path(name)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f), os.path.getmtime(path)
+    except (OSError, ValueError):
+        return None, 0
+
+
+# Download one animation to the asset store; runs on a background thread.
+# requests is only imported here: most starts find every file on disk.
+def _fetch_asset(name):
+    try:
+        import requests
+        r = requests.get(LOTTIE_ANIMATIONS[name], timeout=FETCH_TIMEOUT)
+        r.raise_for_status()
+        data = r.json()
+
+        os.makedirs(ASSET_DIR, exist_ok=True)
+        tmp_path = _asset_path(name) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, _asset_path(name))
+
+        with _lock:
+            _loaded[name] = (data, time.time())
+            _failed_at.pop(name, None)
+    except Exception:
+        with _lock:
+            _failed_at[name] = time.time()
+    finally:
+        with _lock:
+            _fetching.discard(name)
+
+
+def _refresh_in_background(name):
+    with _lock:
+        if name in _fetching or time.time() - _failed_at.get(name, 0) < RETRY_AFTER:
+            return
+        _fetching.add(name)
+    threading.Thread(target=_fetch_asset, args=(name,), daemon=True).start()
+
+
+# Load a Lottie animation by name without ever waiting on the network.
+# Served from memory, then from the on-disk asset store; a missing or stale
+# file is downloaded in the background and None is returned until it arrives.
+@profiled("load_lottie")
+def load_lottie(name):
+    with _lock:
+        cached = _loaded.get(name)
+
+    if cached is None:
+        data, fetched_at = _read_asset(name)
+        if data is not None:
+            with _lock:
+                cached = _loaded.setdefault(name, (data, fetched_at))
+
+    if cached is None or time.time() - cached[1] > REFRESH_AFTER:
+        _refresh_in_background(name)
+    return cached[0] if cached else None
@@ -0,0 +1,6 @@
+# Headless benchmarks for the data paths behind each page, run against
+# synthetic libraries of different sizes: python -m benchmarks --help.
+# python -m benchmarks.startup checks the import time of the entry points.
+from benchmarks.report import compare, format_report, load_baseline, save_baseline
+from benchmarks.suite import benchmark_cases, run_suite
+from benchmarks.synthetic import generate_books, synthetic_library
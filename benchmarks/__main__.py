@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.report import REGRESSION_THRESHOLD, compare, format_report, load_baseline, save_baseline
+from benchmarks.suite import run_suite
+from benchmarks.synthetic import synthetic_library
+from database import ConnectionManager
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Time the library's data paths on synthetic libraries")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000],
+                        help="library sizes to benchmark, 1000 to 1000000 (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic libraries")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (default: %(default)s)")
+    parser.add_argument("--only", nargs="+", metavar="TEXT", help="only cases whose name contains TEXT")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown reported as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for rows in args.rows:
+        start = time.perf_counter()
+        path = synthetic_library(rows, args.seed)
+        print(f"{rows:,} books: {path} ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+
+        manager = ConnectionManager(path)
+        try:
+            with manager.connection() as conn:
+                results[f"{rows}-books"] = run_suite(conn, args.repeat, args.only)
+        finally:
+            manager.close()
+
+    baseline = load_baseline(args.baseline)
+    rows = compare(results, baseline, args.threshold)
+    print(format_report(rows))
+
+    if args.save_baseline:
+        save_baseline(args.baseline, {**baseline, **results})
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+    return 1 if any(row[-1] == "REGRESSION" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
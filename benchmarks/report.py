@@ -0,0 +1,56 @@
+import json
+import os
+
+REGRESSION_THRESHOLD = 0.20  # slower than baseline by more than this share
+NOISE_FLOOR_MS = 0.05  # differences below this are never reported
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+# Compare {dataset: {case: timings}} against the baseline. Returns rows of
+# (dataset, case, baseline ms, current ms, change, verdict).
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    rows = []
+    for dataset, cases in results.items():
+        for case, timings in cases.items():
+            current = timings["median_ms"]
+            before = baseline.get(dataset, {}).get(case, {}).get("median_ms")
+            if before is None:
+                rows.append((dataset, case, None, current, None, "new"))
+                continue
+            change = (current - before) / before if before else 0.0
+            if abs(current - before) < NOISE_FLOOR_MS:
+                verdict = "ok"
+            elif change > threshold:
+                verdict = "REGRESSION"
+            elif change < -threshold:
+                verdict = "faster"
+            else:
+                verdict = "ok"
+            rows.append((dataset, case, before, current, change, verdict))
+    return rows
+
+
+def format_report(rows):
+    width = max([len(case) for _, case, *_ in rows] + [4])
+    lines = [f"{'dataset':<14} {'case':<{width}} {'baseline':>10} {'current':>10} {'change':>8}  verdict"]
+    for dataset, case, before, current, change, verdict in rows:
+        before_text = f"{before:10.3f}" if before is not None else f"{'-':>10}"
+        change_text = f"{change:+8.1%}" if change is not None else f"{'-':>8}"
+        lines.append(f"{dataset:<14} {case:<{width}} {before_text} {current:10.3f} {change_text}  {verdict}")
+    regressions = sum(1 for row in rows if row[-1] == "REGRESSION")
+    lines.append(f"{len(rows)} cases, {regressions} regression{'s' if regressions != 1 else ''} (times in ms, median)")
+    return "\n".join(lines)
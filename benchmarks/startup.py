@@ -0,0 +1,80 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only some pages or commands need; importing an entry point
+# must not load them
+DEFERRED_MODULES = ("pandas", "numpy", "plotly", "pyarrow", "streamlit_lottie", "requests")
+
+# entry module -> (module the runtime imports first, import budget in ms,
+# modules it must not load). The budgets leave about 2x headroom over the
+# measured times so that slow machines don't fail the check. Most of the
+# app's time is Streamlit's emoji table, loaded by st.set_page_config().
+STARTUP_BUDGETS = {
+    "app": ("streamlit", 100, DEFERRED_MODULES),
+    "api": ("", 50, DEFERRED_MODULES + ("streamlit",)),
+    "cli": ("", 30, DEFERRED_MODULES + ("streamlit",)),
+}
+
+
+# One `python -X importtime` run. Returns (ms to import `module`, top-level
+# names of the modules it loaded that `preload` had not).
+def import_profile(module, preload=""):
+    code = f"import {preload}; import {module}" if preload else f"import {module}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    cumulative, loaded = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if not total.strip().isdigit():
+            continue  # the header line
+        top_level = name[1:2] != " "
+        if top_level and name.strip() == preload:
+            loaded = set()  # printed after everything it imported; count only what follows
+            continue
+        loaded.add(name.strip().split(".")[0])
+        if top_level and name.strip() == module:
+            cumulative = int(total) / 1000
+    return cumulative, loaded
+
+
+# [(module, median ms, budget ms, deferred modules loaded)] for every entry point
+def check_startup(runs=5, budgets=STARTUP_BUDGETS):
+    rows = []
+    for module, (preload, budget, deferred) in budgets.items():
+        times, loaded = [], set()
+        for _ in range(runs):
+            ms, names = import_profile(module, preload)
+            times.append(ms)
+            loaded |= names
+        rows.append((module, statistics.median(times), budget, sorted(set(deferred) & loaded)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup",
+                                     description="Check the import time of the app, API and CLI")
+    parser.add_argument("--runs", type=int, default=5, help="imports timed per entry point (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    print(f"{'module':<8} {'import':>9} {'budget':>9}  verdict")
+    for module, ms, budget, loaded in check_startup(args.runs):
+        problems = ["over budget"] if ms > budget else []
+        if loaded:
+            problems.append(f"loads {', '.join(loaded)}")
+        failed = failed or bool(problems)
+        print(f"{module:<8} {ms:7.1f}ms {budget:7d}ms  {'; '.join(problems) or 'ok'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import statistics
+import time
+
+from analytics import LibrarySnapshot, compute_library_statistics
+from covers import cover_colors, generate_book_cover_html
+from database import BOOK_SORTS
+from repository import LibraryRepository
+
+SEARCH_TERMS = ["shadow", "tolkien", "river empire", "sci"]
+FILTERS = {"all": (None, None), "status": ("Completed", None), "genre": (None, "Fantasy")}
+PAGE_SIZE = 24
+COVER_SAMPLE = 1000
+
+
+# The data paths each page runs, as (name, fn(conn)) cases. Pages read
+# through LibraryRepository, so the cases do too.
+
+def _books_cases():
+    cases = []
+    for label, (status, genre) in FILTERS.items():
+        cases.append((f"books.count[{label}]", lambda conn, s=status, g=genre: LibraryRepository(conn).count_books(s, g)))
+        for sort_by in BOOK_SORTS:
+            def first_and_next_page(conn, s=status, g=genre, sort_by=sort_by):
+                repo = LibraryRepository(conn)
+                _, cursor = repo.books_page(s, g, sort_by, limit=PAGE_SIZE)
+                if cursor is not None:
+                    repo.books_page(s, g, sort_by, cursor=cursor, limit=PAGE_SIZE)
+            cases.append((f"books.page[{label},{sort_by}]", first_and_next_page))
+    return cases
+
+
+# The search page used a LIKE scan over the books table before the FTS index
+def _like_search(conn, term):
+    pattern = f"%{term}%"
+    return conn.execute(
+        "SELECT * FROM live_books WHERE title LIKE ? OR author LIKE ? OR genre LIKE ? OR notes LIKE ?",
+        (pattern, pattern, pattern, pattern),
+    ).fetchall()
+
+
+def _search_cases():
+    cases = []
+    for term in SEARCH_TERMS:
+        cases.append((f"search.like[{term}]", lambda conn, t=term: _like_search(conn, t)))
+        cases.append((f"search.fts[{term}]", lambda conn, t=term: LibraryRepository(conn).search(t)))
+    return cases
+
+
+# Everything the Statistics page reads, from the rollup table and (as it was
+# before the rollup) with GROUP BY over books
+def _rollup_statistics(conn):
+    repo = LibraryRepository(conn)
+    repo.totals()
+    for dimension in ("status", "month"):
+        repo.stat_counts(dimension)
+    repo.stat_counts("genre", 5)
+    repo.stat_counts("author", 5)
+
+
+def _group_by_statistics(conn):
+    conn.execute("SELECT COUNT(*), SUM(pages) FROM live_books").fetchone()
+    conn.execute("SELECT AVG(rating) FROM live_books WHERE rating > 0").fetchone()
+    conn.execute("SELECT status, COUNT(*) AS count FROM live_books GROUP BY status ORDER BY count DESC").fetchall()
+    conn.execute("SELECT substr(date_added, 1, 7) AS month, COUNT(*) FROM live_books GROUP BY month ORDER BY month").fetchall()
+    conn.execute("SELECT genre, COUNT(*) AS count FROM live_books GROUP BY genre ORDER BY count DESC LIMIT 5").fetchall()
+    conn.execute("SELECT author, COUNT(*) AS count FROM live_books GROUP BY author ORDER BY count DESC LIMIT 5").fetchall()
+
+
+# The Statistics page groups its charts from the columnar snapshot: loading
+# it happens once per process, grouping once per library generation
+def _snapshot_cases(conn):
+    books, _ = LibrarySnapshot().refresh(conn)
+    return [
+        ("snapshot.load", lambda conn: LibrarySnapshot().refresh(conn)),
+        ("stats.snapshot", lambda _: compute_library_statistics(books)),
+    ]
+
+
+def _cover_cases(conn):
+    books = conn.execute(
+        "SELECT title, author, genre FROM live_books ORDER BY id LIMIT ?", (COVER_SAMPLE,)
+    ).fetchall()
+
+    def cold(_):
+        generate_book_cover_html.__wrapped__.cache_clear()
+        cover_colors.cache_clear()
+        for book in books:
+            generate_book_cover_html(*book)
+
+    def warm(_):
+        for book in books:
+            generate_book_cover_html(*book)
+
+    return [(f"covers.cold[{len(books)}]", cold), (f"covers.warm[{len(books)}]", warm)]
+
+
+def benchmark_cases(conn):
+    return [
+        *_books_cases(),
+        *_search_cases(),
+        ("stats.rollup", _rollup_statistics),
+        ("stats.group_by", _group_by_statistics),
+        *_snapshot_cases(conn),
+        *_cover_cases(conn),
+    ]
+
+
+# Run every case `repeat` times after one warm-up run. Returns
+# {case: {"median_ms": ..., "min_ms": ...}}.
+def run_suite(conn, repeat=5, only=None):
+    results = {}
+    for name, fn in benchmark_cases(conn):
+        if only and not any(pattern in name for pattern in only):
+            continue
+        fn(conn)
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(conn)
+            durations.append((time.perf_counter() - start) * 1000)
+        results[name] = {"median_ms": statistics.median(durations), "min_ms": min(durations)}
+    return results
@@ -0,0 +1,100 @@
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from database import EDITABLE_COLUMNS, GENRES, ConnectionManager
+
+DATA_DIR = os.path.join(tempfile.gettempdir(), "library-benchmarks")
+INSERT_BATCH_SIZE = 10000
+
+# Rough shape of a real personal library: a few genres and statuses dominate
+GENRE_WEIGHTS = [18, 12, 10, 11, 9, 8, 7, 5, 6, 4, 3, 4, 3]
+STATUS_WEIGHTS = {"To Read": 45, "Completed": 38, "Reading": 7, "DNF": 10}
+
+FIRST_NAMES = [
+    "Ada", "Alan", "Anna", "Carlos", "Chen", "Emma", "Fatima", "Grace", "Hiro", "Ivan", "James",
+    "Jane", "Kofi", "Lena", "Maria", "Mohammed", "Nadia", "Olga", "Pablo", "Priya", "Sofia", "Tom",
+]
+LAST_NAMES = [
+    "Achebe", "Austen", "Borges", "Butler", "Christie", "Dickens", "Eco", "Herbert", "Ishiguro",
+    "Kanwal", "Le Guin", "Lovelace", "Morrison", "Murakami", "Nakamura", "Okafor", "Orwell",
+    "Pratchett", "Rowling", "Sagan", "Tolkien", "Woolf",
+]
+TITLE_WORDS = [
+    "Shadow", "River", "Empire", "Garden", "Silent", "Last", "Winter", "Machine", "Secret", "Night",
+    "Glass", "Kingdom", "Memory", "Stone", "Ocean", "Fire", "Library", "Atlas", "Storm", "Letters",
+    "Hidden", "Golden", "Wild", "Broken", "City", "Island", "Song", "Code", "Dream", "Journey",
+]
+NOTE_PHRASES = [
+    "Recommended by a friend.", "Reread the ending twice.", "Slow start but worth it.",
+    "Great world building.", "Borrowed from the library.", "Signed copy.", "Book club pick.",
+]
+
+
+# Authors follow a Zipf-like curve: a handful wrote many of the books
+def _author_pool(rng, size):
+    names = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(size)]
+    weights = [1 / rank for rank in range(1, size + 1)]
+    return names, weights
+
+
+# `rows` synthetic books as (EDITABLE_COLUMNS..., date_added, updated_at)
+# tuples, with date_added spread over the last `years` years
+def generate_books(rows, seed=0, years=5):
+    rng = random.Random(seed)
+    authors, author_weights = _author_pool(rng, max(10, rows // 20))
+    statuses = list(STATUS_WEIGHTS)
+    status_weights = list(STATUS_WEIGHTS.values())
+    start = datetime.now() - timedelta(days=365 * years)
+    span = 365 * years * 24 * 60 * 60
+
+    for _ in range(rows):
+        status = rng.choices(statuses, status_weights)[0]
+        added = (start + timedelta(seconds=rng.randrange(span))).isoformat(sep=" ", timespec="seconds")
+        yield (
+            " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 4))),
+            rng.choices(authors, author_weights)[0],
+            rng.choices(GENRES, GENRE_WEIGHTS)[0],
+            f"978{rng.randrange(10**9, 10**10)}" if rng.random() < 0.7 else None,
+            rng.randint(1850, datetime.now().year),
+            max(40, int(rng.lognormvariate(5.7, 0.4))),
+            rng.randint(1, 10) / 2 if status in ("Completed", "DNF") else 0.0,
+            status,
+            rng.choice(NOTE_PHRASES) if rng.random() < 0.3 else "",
+            added,
+            added,
+        )
+
+
+# Path of a synthetic library with `rows` books, generated on first use.
+# Databases are kept in DATA_DIR and reused by later runs.
+def synthetic_library(rows, seed=0, years=5, data_dir=DATA_DIR):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"books-{rows}-{seed}-{years}y.db")
+    if os.path.exists(path):
+        return path
+
+    tmp_path = path + ".tmp"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(tmp_path + suffix):
+            os.remove(tmp_path + suffix)
+    columns = EDITABLE_COLUMNS + ("date_added", "updated_at")
+    insert = f"INSERT INTO books ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+    manager = ConnectionManager(tmp_path)
+    try:
+        with manager.connection() as conn:
+            books = generate_books(rows, seed, years)
+            while True:
+                batch = [row for _, row in zip(range(INSERT_BATCH_SIZE), books)]
+                if not batch:
+                    break
+                with conn:
+                    conn.executemany(insert, batch)
+            conn.execute("PRAGMA optimize")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        manager.close()
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,130 @@
+import argparse
+import os
+import sys
+
+from database import DEFAULT_LIBRARY, PURGE_RETENTION_DAYS, STATUSES, ConnectionManager, library_path
+from exporter import EXPORT_FORMATS, export_books
+from importer import DEDUPE_MODES, IMPORT_FORMATS, import_books, iter_rows
+from repository import LibraryRepository
+
+
+def _guess_format(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def run_import(args):
+    fmt = args.format or _guess_format(args.path)
+    manager = ConnectionManager(args.db)
+    try:
+        with manager.connection() as conn, open(args.path, "rb") as f:
+            report = import_books(
+                conn, iter_rows(f, fmt), dedupe=args.dedupe, batch_size=args.batch_size,
+                progress=lambda r: print(f"  {r.inserted} rows...", file=sys.stderr),
+            )
+    finally:
+        manager.close()
+
+    print(report.summary())
+    for line, message in report.errors:
+        print(f"  line {line}: {message}")
+    if report.failed > len(report.errors):
+        print(f"  ... and {report.failed - len(report.errors)} more")
+    return 1 if report.failed else 0
+
+
+def run_export(args):
+    fmt = args.format or args.path.rsplit(".", 1)[-1].lower()
+    if fmt not in EXPORT_FORMATS:
+        print(f"cannot tell the export format from {args.path!r}; use --format", file=sys.stderr)
+        return 2
+
+    manager = ConnectionManager(args.db)
+    try:
+        with manager.connection() as conn:
+            if fmt == "parquet" and args.path == "-":
+                print("Parquet cannot be written to standard output", file=sys.stderr)
+                return 2
+            if args.path == "-":
+                exported = export_books(conn, sys.stdout.buffer, fmt, args.status, args.genre)
+            else:
+                with open(args.path, "wb") as f:
+                    exported = export_books(conn, f, fmt, args.status, args.genre)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        manager.close()
+
+    print(f"{exported} books exported", file=sys.stderr)
+    return 0
+
+
+def run_purge(args):
+    manager = ConnectionManager(args.db)
+    try:
+        purged = manager.purge_deleted(args.days)
+    finally:
+        manager.close()
+
+    print(f"{purged} deleted books purged")
+    return 0
+
+
+def run_search(args):
+    manager = ConnectionManager(args.db)
+    try:
+        with manager.connection() as conn:
+            hits, total = LibraryRepository(conn).search(args.term, args.limit)
+    finally:
+        manager.close()
+
+    for hit in hits:
+        print(f"{hit.id}\t{hit.title}\t{hit.author}\t{hit.status}\t{hit.snippet}")
+    print(f"{len(hits)} of {total} matches", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Personal Library Manager command line tools")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY, help="library id (default: %(default)s)")
+    parser.add_argument("--db", help="path to a library database file (overrides --library)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="bulk import books from CSV or JSON Lines")
+    import_parser.add_argument("path", help="file to import")
+    import_parser.add_argument("--format", choices=IMPORT_FORMATS, help="default: from the file extension")
+    import_parser.add_argument("--dedupe", choices=DEDUPE_MODES,
+                               help="skip books whose ISBN or title+author is already in the library")
+    import_parser.add_argument("--batch-size", type=int, default=5000, help="rows per transaction")
+    import_parser.set_defaults(func=run_import)
+
+    export_parser = commands.add_parser("export", help="export books to CSV, JSON Lines or Parquet")
+    export_parser.add_argument("path", help="output file, or - for standard output")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, help="default: from the file extension")
+    export_parser.add_argument("--status", choices=STATUSES, help="only books with this status")
+    export_parser.add_argument("--genre", help="only books in this genre")
+    export_parser.set_defaults(func=run_export)
+
+    purge_parser = commands.add_parser("purge", help="permanently remove books deleted a while ago")
+    purge_parser.add_argument("--days", type=int, default=PURGE_RETENTION_DAYS,
+                              help="purge books deleted more than this many days ago (default: %(default)s)")
+    purge_parser.set_defaults(func=run_purge)
+
+    search_parser = commands.add_parser("search", help="full-text search, one tab-separated book per line")
+    search_parser.add_argument("term", help='words to find; "exact phrase" and prefix* work as in the app')
+    search_parser.add_argument("--limit", type=int, default=50, help="most matches to print (default: %(default)s)")
+    search_parser.set_defaults(func=run_search)
+
+    args = parser.parse_args(argv)
+    if not args.db:
+        try:
+            args.db = library_path(args.library)
+        except ValueError as e:
+            parser.error(str(e))
+        if os.path.dirname(args.db):
+            os.makedirs(os.path.dirname(args.db), exist_ok=True)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
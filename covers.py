@@ -0,0 +1,44 @@
+import hashlib
+from functools import lru_cache
+
+from profiling import profiled
+
+GENRE_ICONS = {
+    "Fiction": "📖",
+    "Non-Fiction": "📋",
+    "Science Fiction": "🚀",
+    "Fantasy": "🧙",
+    "Mystery": "🔍",
+    "Thriller": "🔪",
+    "Romance": "❤️",
+    "Biography": "👤",
+    "History": "⏳",
+    "Self-Help": "🧠",
+    "Business": "💼",
+    "Science": "🔬",
+    "Other": "📚"
+}
+
+COVER_CACHE_SIZE = 4096
+
+
+# Generate a deterministic gradient (two hex colours) based on the title
+@lru_cache(maxsize=COVER_CACHE_SIZE)
+def cover_colors(title):
+    hash_hex = hashlib.md5(title.encode()).hexdigest()
+    r1, g1, b1 = int(hash_hex[0:2], 16), int(hash_hex[2:4], 16), int(hash_hex[4:6], 16)
+    r2, g2, b2 = int(hash_hex[6:8], 16), int(hash_hex[8:10], 16), int(hash_hex[10:12], 16)
+
+    # Ensure colors are vibrant enough
+    r1, g1, b1 = max(r1, 50), max(g1, 50), max(b1, 50)
+    return f"#{r1:02x}{g1:02x}{b1:02x}", f"#{r2:02x}{g2:02x}{b2:02x}"
+
+
+# Generate a dynamic book cover based on book title and author. The layout
+# lives in the .cover rules of static/style.css; each cover only sets its colours.
+@profiled("cover html")
+@lru_cache(maxsize=COVER_CACHE_SIZE)
+def generate_book_cover_html(title, author, genre=None):
+    color1, color2 = cover_colors(title)
+    icon = GENRE_ICONS.get(genre, "📚")
+    return f'<div class="cover" style="--c1:{color1};--c2:{color2}"><b>{title}</b><i>by {author}</i><span>{icon}</span></div>'
@@ -0,0 +1,944 @@
+import os
+import queue
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from profiling import ProfiledCursor
+
+DB_PATH = "library.db"
+LIBRARY_DIR = "libraries"
+DEFAULT_LIBRARY = "default"
+LIBRARY_ID_PATTERN = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}")
+
+
+GENRES = [
+    "Fiction", "Non-Fiction", "Science Fiction", "Fantasy", "Mystery", "Thriller", "Romance",
+    "Biography", "History", "Self-Help", "Business", "Science", "Other",
+]
+STATUSES = ["To Read", "Reading", "Completed", "DNF"]
+
+BOOK_COLUMNS = (
+    "id", "title", "author", "genre", "isbn", "publication_year",
+    "pages", "rating", "status", "date_added", "notes", "version", "updated_at", "deleted_at",
+)
+# Columns a user edits (everything but id and the bookkeeping columns)
+EDITABLE_COLUMNS = BOOK_COLUMNS[1:9] + ("notes",)
+
+BUSY_RETRIES = 6
+BUSY_BASE_DELAY = 0.05  # seconds; doubles on every retry
+WRITE_BATCH_SIZE = 64  # queued writes applied per transaction
+UPDATE_CHUNK_SIZE = 500  # ids bound per UPDATE ... WHERE id IN (...)
+# Soft-deleted books are kept this long (for undo) before being purged
+PURGE_RETENTION_DAYS = 30
+PURGE_INTERVAL = 60 * 60  # seconds between purge runs
+VACUUM_FREE_RATIO = 0.25  # rewrite the file once this share of its pages is free
+
+
+# Rollup dimensions kept in library_stats: dimension -> grouping key of a row
+STATS_DIMENSIONS = {
+    "total": "''",
+    "status": "COALESCE({row}.status, '')",
+    "genre": "COALESCE({row}.genre, '')",
+    "author": "{row}.author",
+    "month": "COALESCE(substr({row}.date_added, 1, 7), '')",
+}
+
+
+# Trigger statements that add (sign=1) or remove (sign=-1) one books row
+# from every rollup group it belongs to
+def _stats_trigger_body(row, sign):
+    pages = f"COALESCE({row}.pages, 0)"
+    rated = f"(COALESCE({row}.rating, 0) > 0)"
+    rating = f"(CASE WHEN {row}.rating > 0 THEN {row}.rating ELSE 0 END)"
+    statements = []
+    for dimension, key in STATS_DIMENSIONS.items():
+        key = key.format(row=row)
+        if sign > 0:
+            statements.append(
+                "INSERT INTO library_stats (dimension, key, books, pages, rated, rating_sum) "
+                f"VALUES ('{dimension}', {key}, 1, {pages}, {rated}, {rating}) "
+                "ON CONFLICT (dimension, key) DO UPDATE SET "
+                "books = books + 1, pages = pages + excluded.pages, "
+                "rated = rated + excluded.rated, rating_sum = rating_sum + excluded.rating_sum;"
+            )
+        else:
+            statements.append(
+                f"UPDATE library_stats SET books = books - 1, pages = pages - {pages}, "
+                f"rated = rated - {rated}, rating_sum = rating_sum - {rating} "
+                f"WHERE dimension = '{dimension}' AND key = {key};"
+            )
+            if dimension != "total":
+                statements.append(
+                    f"DELETE FROM library_stats WHERE dimension = '{dimension}' AND key = {key} AND books <= 0;"
+                )
+    return "\n".join(statements)
+
+
+def _stats_backfill():
+    return [
+        "INSERT INTO library_stats (dimension, key, books, pages, rated, rating_sum) "
+        f"SELECT '{dimension}', {key.format(row='books')}, COUNT(*), COALESCE(SUM(pages), 0), "
+        "COALESCE(SUM(rating > 0), 0), COALESCE(SUM(CASE WHEN rating > 0 THEN rating ELSE 0 END), 0) "
+        f"FROM books GROUP BY 2"
+        for dimension, key in STATS_DIMENSIONS.items()
+    ]
+
+
+# Filter/sort indexes of migration 2, rebuilt in migration 8 to cover only
+# books that are not soft-deleted
+LIVE_BOOK_INDEXES = [
+    ("idx_books_title", "title"),
+    ("idx_books_author", "author"),
+    ("idx_books_rating", "rating"),
+    ("idx_books_date_added", "date_added"),
+    ("idx_books_status_title", "status, title"),
+    ("idx_books_status_author", "status, author"),
+    ("idx_books_status_rating", "status, rating"),
+    ("idx_books_status_date_added", "status, date_added"),
+    ("idx_books_genre_title", "genre, title"),
+    ("idx_books_genre_author", "genre, author"),
+    ("idx_books_genre_rating", "genre, rating"),
+    ("idx_books_genre_date_added", "genre, date_added"),
+    ("idx_books_status_genre", "status, genre"),
+    ("idx_books_month", "substr(date_added, 1, 7)"),
+]
+
+
+# Ordered schema migrations: (version, description, statements).
+# Append new steps to the end; never edit a step that has shipped.
+MIGRATIONS = [
+    (1, "create books table", [
+        '''
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            genre TEXT,
+            isbn TEXT,
+            publication_year INTEGER,
+            pages INTEGER,
+            rating REAL,
+            status TEXT,
+            date_added TEXT,
+            notes TEXT
+        )
+        ''',
+    ]),
+    (2, "indexes for My Books filters/sorts and statistics groupings", [
+        # Unfiltered sorts, GROUP BY author and the dashboard's recent books
+        "CREATE INDEX IF NOT EXISTS idx_books_title ON books (title)",
+        "CREATE INDEX IF NOT EXISTS idx_books_author ON books (author)",
+        "CREATE INDEX IF NOT EXISTS idx_books_rating ON books (rating)",
+        "CREATE INDEX IF NOT EXISTS idx_books_date_added ON books (date_added)",
+        # Status filter (+ GROUP BY status) with each sort order
+        "CREATE INDEX IF NOT EXISTS idx_books_status_title ON books (status, title)",
+        "CREATE INDEX IF NOT EXISTS idx_books_status_author ON books (status, author)",
+        "CREATE INDEX IF NOT EXISTS idx_books_status_rating ON books (status, rating)",
+        "CREATE INDEX IF NOT EXISTS idx_books_status_date_added ON books (status, date_added)",
+        # Genre filter (+ DISTINCT genre / GROUP BY genre) with each sort order
+        "CREATE INDEX IF NOT EXISTS idx_books_genre_title ON books (genre, title)",
+        "CREATE INDEX IF NOT EXISTS idx_books_genre_author ON books (genre, author)",
+        "CREATE INDEX IF NOT EXISTS idx_books_genre_rating ON books (genre, rating)",
+        "CREATE INDEX IF NOT EXISTS idx_books_genre_date_added ON books (genre, date_added)",
+        # Status and genre together
+        "CREATE INDEX IF NOT EXISTS idx_books_status_genre ON books (status, genre)",
+        # Books added per month on the Statistics page
+        "CREATE INDEX IF NOT EXISTS idx_books_month ON books (substr(date_added, 1, 7))",
+    ]),
+    (3, "full-text search index over books", [
+        # External-content FTS5 table: the text lives in books, only the index here
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, author, genre, notes, isbn,
+            content='books', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title, author, genre, notes, isbn)
+            VALUES (new.id, new.title, new.author, new.genre, new.notes, new.isbn);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author, genre, notes, isbn)
+            VALUES ('delete', old.id, old.title, old.author, old.genre, old.notes, old.isbn);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS books_fts_au
+        AFTER UPDATE OF title, author, genre, notes, isbn ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author, genre, notes, isbn)
+            VALUES ('delete', old.id, old.title, old.author, old.genre, old.notes, old.isbn);
+            INSERT INTO books_fts (rowid, title, author, genre, notes, isbn)
+            VALUES (new.id, new.title, new.author, new.genre, new.notes, new.isbn);
+        END
+        """,
+        "INSERT INTO books_fts (books_fts) VALUES ('rebuild')",
+        # Title matches outrank author, genre, notes and ISBN matches
+        "INSERT INTO books_fts (books_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 2.0, 1.0, 1.0)')",
+    ]),
+    (4, "rollup table for statistics and quick stats", [
+        """
+        CREATE TABLE IF NOT EXISTS library_stats (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            books INTEGER NOT NULL DEFAULT 0,
+            pages INTEGER NOT NULL DEFAULT 0,
+            rated INTEGER NOT NULL DEFAULT 0,
+            rating_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, key)
+        ) WITHOUT ROWID
+        """,
+        "DELETE FROM library_stats",
+        *_stats_backfill(),
+        # The total row always exists so an empty library reads as zeros
+        "INSERT OR IGNORE INTO library_stats (dimension, key) VALUES ('total', '')",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS books_stats_ai AFTER INSERT ON books BEGIN
+            {_stats_trigger_body("new", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS books_stats_ad AFTER DELETE ON books BEGIN
+            {_stats_trigger_body("old", -1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS books_stats_au
+        AFTER UPDATE OF author, genre, status, date_added, pages, rating ON books BEGIN
+            {_stats_trigger_body("old", -1)}
+            {_stats_trigger_body("new", 1)}
+        END
+        """,
+    ]),
+    (5, "library generation counter bumped by every write", [
+        "CREATE TABLE IF NOT EXISTS library_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO library_meta (key, value) VALUES ('generation', 0)",
+        *[
+            f"""
+            CREATE TRIGGER IF NOT EXISTS books_generation_{suffix} AFTER {event} ON books BEGIN
+                UPDATE library_meta SET value = value + 1 WHERE key = 'generation';
+            END
+            """
+            for suffix, event in (("ai", "INSERT"), ("ad", "DELETE"), ("au", "UPDATE"))
+        ],
+    ]),
+    (6, "reading progress event log", [
+        """
+        CREATE TABLE IF NOT EXISTS reading_progress (
+            id INTEGER PRIMARY KEY,
+            book_id INTEGER NOT NULL REFERENCES books (id) ON DELETE CASCADE,
+            page INTEGER NOT NULL,
+            recorded_at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_reading_progress_book ON reading_progress (book_id, recorded_at)",
+        # Every book with its most recent progress event (one index seek per book)
+        """
+        CREATE VIEW IF NOT EXISTS book_progress AS
+        SELECT b.id, b.title, b.author, b.genre, b.status, b.pages,
+               p.page AS current_page,
+               p.recorded_at AS progress_at,
+               CASE WHEN b.pages > 0 THEN MIN(100.0, 100.0 * COALESCE(p.page, 0) / b.pages) END AS percent
+        FROM books b
+        LEFT JOIN reading_progress p ON p.id = (
+            SELECT id FROM reading_progress
+            WHERE book_id = b.id
+            ORDER BY recorded_at DESC, id DESC
+            LIMIT 1
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS reading_progress_generation_ai AFTER INSERT ON reading_progress BEGIN
+            UPDATE library_meta SET value = value + 1 WHERE key = 'generation';
+        END
+        """,
+    ]),
+    (7, "row versions for optimistic locking", [
+        "ALTER TABLE books ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE books ADD COLUMN updated_at TEXT",
+        "UPDATE books SET updated_at = date_added",
+    ]),
+    (8, "soft deletes with partial indexes over live books", [
+        "ALTER TABLE books ADD COLUMN deleted_at TEXT",
+        # Live queries go through this view so they always carry the
+        # deleted_at IS NULL term that lets SQLite use the partial indexes
+        "CREATE VIEW IF NOT EXISTS live_books AS SELECT * FROM books WHERE deleted_at IS NULL",
+        *[
+            statement
+            for name, columns in LIVE_BOOK_INDEXES
+            for statement in (
+                f"DROP INDEX IF EXISTS {name}",
+                f"CREATE INDEX {name} ON books ({columns}) WHERE deleted_at IS NULL",
+            )
+        ],
+        # Tombstones, oldest first, for the purge job
+        "CREATE INDEX IF NOT EXISTS idx_books_deleted_at ON books (deleted_at) WHERE deleted_at IS NOT NULL",
+        # Rollups count live books only: soft-deleting or restoring a book
+        # moves it out of or back into its groups
+        "DROP TRIGGER IF EXISTS books_stats_ai",
+        "DROP TRIGGER IF EXISTS books_stats_ad",
+        "DROP TRIGGER IF EXISTS books_stats_au",
+        f"""
+        CREATE TRIGGER books_stats_ai AFTER INSERT ON books WHEN new.deleted_at IS NULL BEGIN
+            {_stats_trigger_body("new", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER books_stats_ad AFTER DELETE ON books WHEN old.deleted_at IS NULL BEGIN
+            {_stats_trigger_body("old", -1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER books_stats_au_old
+        AFTER UPDATE OF author, genre, status, date_added, pages, rating, deleted_at ON books
+        WHEN old.deleted_at IS NULL BEGIN
+            {_stats_trigger_body("old", -1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER books_stats_au_new
+        AFTER UPDATE OF author, genre, status, date_added, pages, rating, deleted_at ON books
+        WHEN new.deleted_at IS NULL BEGIN
+            {_stats_trigger_body("new", 1)}
+        END
+        """,
+        "DROP VIEW IF EXISTS book_progress",
+        """
+        CREATE VIEW book_progress AS
+        SELECT b.id, b.title, b.author, b.genre, b.status, b.pages,
+               p.page AS current_page,
+               p.recorded_at AS progress_at,
+               CASE WHEN b.pages > 0 THEN MIN(100.0, 100.0 * COALESCE(p.page, 0) / b.pages) END AS percent
+        FROM live_books b
+        LEFT JOIN reading_progress p ON p.id = (
+            SELECT id FROM reading_progress
+            WHERE book_id = b.id
+            ORDER BY recorded_at DESC, id DESC
+            LIMIT 1
+        )
+        """,
+    ]),
+    (9, "index of changed books for incremental analytics snapshots", [
+        # Covers deleted books too: the snapshot has to see them go
+        "CREATE INDEX IF NOT EXISTS idx_books_updated_at ON books (updated_at)",
+    ]),
+]
+
+
+def get_schema_version(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, description TEXT, applied_at TEXT)"
+    )
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+# Apply every pending migration, each in its own write transaction
+def migrate(conn):
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) "
+                "VALUES (?, ?, datetime('now'))",
+                (version, description),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+# Changes whenever the books table does; read-query caches key on it
+def get_generation(conn):
+    return conn.execute("SELECT value FROM library_meta WHERE key = 'generation'").fetchone()[0]
+
+
+# Check if this is a new user (no books in database) without counting every row
+def is_library_empty(conn):
+    return not conn.execute("SELECT EXISTS (SELECT 1 FROM live_books)").fetchone()[0]
+
+
+# My Books sort options: (column, direction). Every page is ordered by the
+# sort column and then id, so (value, id) uniquely marks a position
+BOOK_SORTS = {
+    "Title": ("title", "ASC"),
+    "Author": ("author", "ASC"),
+    "Rating": ("rating", "DESC"),
+    "Recently Added": ("date_added", "DESC"),
+}
+
+
+def _book_filters(status=None, genre=None):
+    clauses, params = [], []
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if genre:
+        clauses.append("genre = ?")
+        params.append(genre)
+    return clauses, params
+
+
+def count_books(conn, status=None, genre=None):
+    # A single filter (or none) is one rollup row; both filters need the index
+    if not (status and genre):
+        dimension, key = ("status", status) if status else ("genre", genre) if genre else ("total", "")
+        row = conn.execute(
+            "SELECT books FROM library_stats WHERE dimension = ? AND key = ?", (dimension, key)
+        ).fetchone()
+        return row[0] if row else 0
+    clauses, params = _book_filters(status, genre)
+    query = "SELECT COUNT(*) FROM live_books"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    return conn.execute(query, params).fetchone()[0]
+
+
+# Library-wide totals from the rollup: (books, pages, average rating)
+def get_library_totals(conn):
+    books, pages, rated, rating_sum = conn.execute(
+        "SELECT books, pages, rated, rating_sum FROM library_stats "
+        "WHERE dimension = 'total' AND key = ''"
+    ).fetchone()
+    return books, pages, (rating_sum / rated if rated else 0)
+
+
+# (group, number of books) for one rollup dimension, largest first
+# (months in calendar order)
+def get_stat_counts(conn, dimension, limit=-1):
+    order = "key" if dimension == "month" else "books DESC, key"
+    return conn.execute(
+        f"SELECT NULLIF(key, ''), books FROM library_stats WHERE dimension = ? "
+        f"ORDER BY {order} LIMIT ?",
+        (dimension, limit),
+    ).fetchall()
+
+
+def timestamp():
+    return datetime.now().isoformat(sep=" ", timespec="milliseconds")
+
+
+def _is_busy(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+# Run fn(), retrying with jittered exponential backoff while another
+# connection holds the write lock longer than the busy timeout
+def retry_on_busy(fn, retries=BUSY_RETRIES, base_delay=BUSY_BASE_DELAY):
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == retries:
+                raise
+            time.sleep(base_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+# Write operations. They run inside the write queue's transaction (see
+# ConnectionManager.write) and must not commit or roll back themselves.
+
+# Add a book; values are in EDITABLE_COLUMNS order. Returns the new id.
+def insert_book(conn, values):
+    now = timestamp()
+    columns = EDITABLE_COLUMNS + ("date_added", "updated_at")
+    return conn.execute(
+        f"INSERT INTO books ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+        tuple(values) + (now[:19], now),
+    ).lastrowid
+
+
+# Compare-and-swap update: only applies if the book is still at
+# expected_version. Returns the new version, or None if someone else
+# changed (or deleted) the book first.
+def update_book(conn, book_id, expected_version, values):
+    assignments = ", ".join(f"{column} = ?" for column in EDITABLE_COLUMNS)
+    updated = conn.execute(
+        f"UPDATE books SET {assignments}, version = version + 1, updated_at = ? "
+        "WHERE id = ? AND version = ?",
+        tuple(values) + (timestamp(), book_id, expected_version),
+    ).rowcount
+    return expected_version + 1 if updated else None
+
+
+def _assignments(changes):
+    unknown = set(changes) - set(EDITABLE_COLUMNS)
+    if unknown:
+        raise ValueError(f"not editable: {', '.join(sorted(unknown))}")
+    return ", ".join(f"{column} = ?" for column in changes)
+
+
+# Set the same values ({column: value}) on many books at once. Returns the
+# number of books changed; deleted or missing ids are ignored.
+def update_books(conn, book_ids, changes):
+    assignments = _assignments(changes)
+    now = timestamp()
+    updated = 0
+    for start in range(0, len(book_ids), UPDATE_CHUNK_SIZE):
+        chunk = book_ids[start:start + UPDATE_CHUNK_SIZE]
+        placeholders = ", ".join("?" for _ in chunk)
+        updated += conn.execute(
+            f"UPDATE books SET {assignments}, version = version + 1, updated_at = ? "
+            f"WHERE id IN ({placeholders}) AND deleted_at IS NULL",
+            (*changes.values(), now, *chunk),
+        ).rowcount
+    return updated
+
+
+# Apply per-book edits [(id, expected_version, {column: value})], writing
+# only the columns that changed. Each book is compare-and-swapped like
+# update_book(). Returns the ids of books changed by someone else first.
+def apply_book_edits(conn, edits):
+    now = timestamp()
+    conflicts = []
+    for book_id, expected_version, changes in edits:
+        updated = conn.execute(
+            f"UPDATE books SET {_assignments(changes)}, version = version + 1, updated_at = ? "
+            "WHERE id = ? AND version = ? AND deleted_at IS NULL",
+            (*changes.values(), now, book_id, expected_version),
+        ).rowcount
+        if not updated:
+            conflicts.append(book_id)
+    return conflicts
+
+
+# Soft-delete books in one statement. Returns (id, title) of the books that
+# were deleted; ids already deleted or missing are ignored.
+def delete_books(conn, book_ids):
+    now = timestamp()
+    placeholders = ", ".join("?" for _ in book_ids)
+    return conn.execute(
+        "UPDATE books SET deleted_at = ?, version = version + 1, updated_at = ? "
+        f"WHERE id IN ({placeholders}) AND deleted_at IS NULL RETURNING id, title",
+        (now, now, *book_ids),
+    ).fetchall()
+
+
+# Undo soft deletes. Returns the number of books restored.
+def restore_books(conn, book_ids):
+    placeholders = ", ".join("?" for _ in book_ids)
+    return conn.execute(
+        "UPDATE books SET deleted_at = NULL, version = version + 1, updated_at = ? "
+        f"WHERE id IN ({placeholders}) AND deleted_at IS NOT NULL",
+        (timestamp(), *book_ids),
+    ).rowcount
+
+
+# Permanently remove books soft-deleted before `cutoff` (a timestamp()
+# string). Their FTS entries and progress events go with them.
+def purge_deleted_books(conn, cutoff):
+    return conn.execute(
+        "DELETE FROM books WHERE deleted_at IS NOT NULL AND deleted_at < ?", (cutoff,)
+    ).rowcount
+
+
+# Save a batch of (book_id, page) progress updates
+def record_progress(conn, updates):
+    recorded_at = timestamp()[:19]
+    conn.executemany(
+        "INSERT INTO reading_progress (book_id, page, recorded_at) VALUES (?, ?, ?)",
+        [(book_id, page, recorded_at) for book_id, page in updates],
+    )
+
+
+# Stream every book matching the filters in id order, `chunk_size` rows at
+# a time, without loading the table into memory
+def iter_books(conn, status=None, genre=None, chunk_size=1000):
+    clauses, params = _book_filters(status, genre)
+    query = "SELECT * FROM live_books"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    cursor = conn.execute(query + " ORDER BY id", params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+# Keyset (seek) pagination: fetch `limit` books that come after `cursor`,
+# the (sort value, id) of the last book already shown. Returns the rows and
+# the cursor for the following page, or None when this is the last page.
+def fetch_books_page(conn, status=None, genre=None, sort_by="Title", cursor=None, limit=24):
+    column, direction = BOOK_SORTS[sort_by]
+    clauses, params = _book_filters(status, genre)
+
+    # NULLs sort first ascending and last descending. Each seek below is a
+    # separate index range; the next one only runs when a page spans both.
+    if cursor is None:
+        seeks = [(None, [])]
+    else:
+        value, last_id = cursor
+        op = ">" if direction == "ASC" else "<"
+        if value is None:
+            seeks = [(f"{column} IS NULL AND id {op} ?", [last_id])]
+            if direction == "ASC":
+                seeks.append((f"{column} IS NOT NULL", []))
+        else:
+            seeks = [(f"({column}, id) {op} (?, ?)", [value, last_id])]
+            if direction == "DESC":
+                seeks.append((f"{column} IS NULL", []))
+
+    rows = []
+    for seek, seek_params in seeks:
+        where = clauses + ([seek] if seek else [])
+        query = "SELECT * FROM live_books"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += f" ORDER BY {column} {direction}, id {direction} LIMIT ?"
+        rows += conn.execute(query, params + seek_params + [limit + 1 - len(rows)]).fetchall()
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (last[BOOK_COLUMNS.index(column)], last[0])
+    return rows, next_cursor
+
+
+# Turn what the user typed into an FTS5 query: "quoted phrases" stay phrases,
+# word* is a prefix query, and the last word is matched as a prefix so
+# results appear while typing
+def build_fts_query(term):
+    parts = []
+    for phrase, word in re.findall(r'"([^"]*)"?|(\S+)', term):
+        if phrase.strip():
+            parts.append('"' + phrase.strip().replace('"', '""') + '"')
+        elif word:
+            prefix = word.endswith("*")
+            word = word.rstrip("*").replace('"', '""')
+            if word:
+                parts.append(f'"{word}"' + ("*" if prefix else ""))
+    if parts and not term[-1].isspace() and not term.endswith('"') and not parts[-1].endswith("*"):
+        parts[-1] += "*"
+    return " ".join(parts)
+
+
+# Ranked full-text search; each row is a books row followed by a
+# highlighted snippet from the best-matching column
+def search_library(conn, term, limit=50):
+    query = build_fts_query(term)
+    if not query:
+        return [], 0
+    try:
+        total = conn.execute("""
+        SELECT COUNT(*) FROM books_fts JOIN live_books books ON books.id = books_fts.rowid
+        WHERE books_fts MATCH ?
+        """, (query,)).fetchone()[0]
+        results = conn.execute("""
+        SELECT books.*, snippet(books_fts, -1, '**', '**', '…', 12)
+        FROM books_fts JOIN live_books books ON books.id = books_fts.rowid
+        WHERE books_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """, (query, limit)).fetchall()
+    except sqlite3.OperationalError:
+        return [], 0
+    return results, total
+
+
+# Connections handed out by a ConnectionManager know which manager (and so
+# which write queue) they belong to
+class LibraryConnection(sqlite3.Connection):
+    manager = None
+
+
+# Connection whose statements all go through a ProfiledCursor, so each one
+# lands in the profiling query log with its duration and row count
+class ProfiledConnection(LibraryConnection):
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# Process-wide pool of SQLite connections shared by every session, plus a
+# single writer thread that applies queued writes in batched transactions
+class ConnectionManager:
+    def __init__(self, path=DB_PATH, pool_size=8, busy_timeout_ms=5000, profile=False):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.profile = profile
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._connections = []
+        self._writes = queue.Queue()
+        self._writer = None
+
+        with self.connection() as conn:
+            migrate(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            factory=ProfiledConnection if self.profile else LibraryConnection,
+        )
+        conn.manager = self
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    # Borrow a connection for the duration of one script run
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _release(self, conn):
+        # Never hand a half-finished transaction to the next borrower
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            with self._lock:
+                self._connections.remove(conn)
+            conn.close()
+
+    # Apply fn(conn, *args) on the writer thread and return its result.
+    # Concurrent writes are grouped into one BEGIN IMMEDIATE transaction,
+    # each in its own savepoint so a failing write does not undo the others.
+    def write(self, fn, *args):
+        future = Future()
+        # Queued under the lock so a dying writer cannot miss a job it
+        # should fail: every job lands either before it drains the queue or
+        # after it has cleared _writer and a new one has started
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run_writer, name=f"writer:{self.path}", daemon=True)
+                self._writer.start()
+            self._writes.put((fn, args, future))
+        return future.result()
+
+    def _run_writer(self):
+        conn, batch = None, []
+        try:
+            conn = self._connect()
+            conn.isolation_level = None  # transactions are managed explicitly below
+            stopping = False
+            while not stopping:
+                job = self._writes.get()
+                if job is None:
+                    break
+                batch = [job]
+                while len(batch) < WRITE_BATCH_SIZE:
+                    try:
+                        job = self._writes.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        stopping = True
+                        break
+                    batch.append(job)
+                self._apply_writes(conn, batch)
+                batch = []
+        except Exception as e:
+            self._writer_failed(conn, batch, e)
+
+    # The writer thread could not open its connection or recover from a
+    # failed transaction. Fail the writes in flight and queued with that
+    # error, and let the next write() start a fresh writer.
+    def _writer_failed(self, conn, batch, error):
+        with self._lock:
+            if self._writer is threading.current_thread():
+                self._writer = None
+            while True:
+                try:
+                    job = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    batch.append(job)
+            if conn is not None and conn in self._connections:
+                self._connections.remove(conn)
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _apply_writes(self, conn, batch):
+        outcomes = []
+        try:
+            retry_on_busy(lambda: conn.execute("BEGIN IMMEDIATE"))
+            for fn, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT queued_write")
+                try:
+                    outcomes.append((future, fn(conn, *args), None))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO queued_write")
+                    outcomes.append((future, None, e))
+                conn.execute("RELEASE queued_write")
+            retry_on_busy(lambda: conn.execute("COMMIT"))
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    # Hard-delete books soft-deleted more than retention_days ago. The delete
+    # goes through the write queue; the file is only vacuumed when purging
+    # left a large share of it unused. Returns the number of books purged.
+    def purge_deleted(self, retention_days=PURGE_RETENTION_DAYS):
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat(sep=" ", timespec="milliseconds")
+        purged = self.write(purge_deleted_books, cutoff)
+        if purged:
+            with self.connection() as conn:
+                free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                total = conn.execute("PRAGMA page_count").fetchone()[0]
+                if total and free / total >= VACUUM_FREE_RATIO:
+                    retry_on_busy(lambda: conn.execute("VACUUM"))
+        return purged
+
+    def close(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._writes.put(None)
+            writer.join()
+        while True:
+            try:
+                self._pool.get_nowait()
+            except queue.Empty:
+                break
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+# Database file for a library id. The default library keeps using
+# default_path (library.db); every other library gets its own file under
+# library_dir.
+def library_path(library_id, library_dir=LIBRARY_DIR, default_path=DB_PATH):
+    if library_id == DEFAULT_LIBRARY:
+        return default_path
+    if not LIBRARY_ID_PATTERN.fullmatch(library_id or ""):
+        raise ValueError(
+            "library ids are 1-64 lowercase letters, digits, '-' or '_', starting with a letter or digit"
+        )
+    return os.path.join(library_dir, f"{library_id}.db")
+
+
+# Routes each library id to its own connection pool. Libraries are separate
+# SQLite files, so writers in one library never wait on another's lock.
+class ConnectionRouter:
+    def __init__(self, library_dir=LIBRARY_DIR, default_path=DB_PATH, **manager_options):
+        self.library_dir = library_dir
+        self.default_path = default_path
+        self.manager_options = manager_options
+        self._managers = {}
+        self._lock = threading.Lock()
+        self._purger = None
+        self._stopping = threading.Event()
+
+    # The library's ConnectionManager, opened on first use. With create=False
+    # a library without a database file raises FileNotFoundError instead of
+    # being created.
+    def manager(self, library_id, create=True):
+        manager = self._managers.get(library_id)
+        if manager is None:
+            path = library_path(library_id, self.library_dir, self.default_path)
+            if not create and not os.path.exists(path):
+                raise FileNotFoundError(f"no library '{library_id}'")
+            with self._lock:
+                manager = self._managers.get(library_id)
+                if manager is None:
+                    if os.path.dirname(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                    manager = ConnectionManager(path, **self.manager_options)
+                    self._managers[library_id] = manager
+        return manager
+
+    def connection(self, library_id, create=True):
+        return self.manager(library_id, create).connection()
+
+    def libraries(self):
+        with self._lock:
+            return sorted(self._managers)
+
+    # Purge old soft-deleted books from every open library on a background
+    # thread, once now and then every `interval` seconds until close()
+    def start_purging(self, retention_days=PURGE_RETENTION_DAYS, interval=PURGE_INTERVAL):
+        with self._lock:
+            if self._purger is not None:
+                return
+            self._purger = threading.Thread(
+                target=self._run_purger, args=(retention_days, interval), name="purger", daemon=True
+            )
+            self._purger.start()
+
+    def _run_purger(self, retention_days, interval):
+        while True:
+            for library_id in self.libraries():
+                try:
+                    self.manager(library_id).purge_deleted(retention_days)
+                except sqlite3.Error:
+                    pass  # try again on the next run
+            if self._stopping.wait(interval):
+                return
+
+    def close(self):
+        self._stopping.set()
+        with self._lock:
+            purger, self._purger = self._purger, None
+        if purger is not None:
+            purger.join()
+        with self._lock:
+            for manager in self._managers.values():
+                manager.close()
+            self._managers.clear()
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+
+from database import BOOK_COLUMNS, iter_books
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_MIME_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+PARQUET_CHUNK_SIZE = 50000  # rows per Parquet row group
+
+
+def _write_csv(chunks, stream):
+    writer = csv.writer(stream)
+    writer.writerow(BOOK_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+
+
+def _write_jsonl(chunks, stream):
+    for rows in chunks:
+        stream.writelines(
+            json.dumps(dict(zip(BOOK_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows
+        )
+
+
+def _write_parquet(chunks, binary_out):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow") from None
+
+    schema = pa.schema([
+        ("id", pa.int64()), ("title", pa.string()), ("author", pa.string()),
+        ("genre", pa.string()), ("isbn", pa.string()), ("publication_year", pa.int32()),
+        ("pages", pa.int32()), ("rating", pa.float32()), ("status", pa.string()),
+        ("date_added", pa.string()), ("notes", pa.string()), ("version", pa.int64()),
+        ("updated_at", pa.string()), ("deleted_at", pa.string()),
+    ])
+    with pq.ParquetWriter(binary_out, schema, compression="zstd") as writer:
+        for rows in chunks:
+            columns = [list(column) for column in zip(*rows)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+
+# Stream the books matching the My Books filters to a binary file object in
+# csv, jsonl or parquet format. Memory use is bounded by the chunk size.
+# Returns the number of books written.
+def export_books(conn, binary_out, fmt, status=None, genre=None, chunk_size=1000):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}")
+
+    exported = 0
+
+    def counted(chunks):
+        nonlocal exported
+        for rows in chunks:
+            exported += len(rows)
+            yield rows
+
+    if fmt == "parquet":
+        chunks = iter_books(conn, status, genre, max(chunk_size, PARQUET_CHUNK_SIZE))
+    else:
+        chunks = iter_books(conn, status, genre, chunk_size)
+    try:
+        if fmt == "parquet":
+            _write_parquet(counted(chunks), binary_out)
+        else:
+            stream = io.TextIOWrapper(binary_out, encoding="utf-8", newline="")
+            try:
+                (_write_csv if fmt == "csv" else _write_jsonl)(counted(chunks), stream)
+                stream.flush()
+            finally:
+                stream.detach()  # leave the caller's file open
+    finally:
+        chunks.close()  # release the read cursor even if the writer failed
+    return exported
@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+import math
+import time
+from datetime import datetime
+
+from database import GENRES, STATUSES, retry_on_busy, timestamp
+
+IMPORT_COLUMNS = (
+    "title", "author", "genre", "isbn", "publication_year",
+    "pages", "rating", "status", "date_added", "notes",
+)
+IMPORT_FORMATS = ("csv", "jsonl")
+DEDUPE_MODES = ("isbn", "title-author")
+MAX_REPORTED_ERRORS = 1000
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# Outcome of one bulk import
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors = []  # (line number, message), capped at MAX_REPORTED_ERRORS
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.inserted / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self):
+        return (
+            f"{self.inserted} imported, {self.duplicates} duplicates skipped, "
+            f"{self.failed} rejected in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+        )
+
+
+# Yield (line number, raw row dict) from a CSV text stream with a header row
+def iter_csv(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, {(k or "").strip().lower(): v for k, v in row.items()}
+
+
+# Yield (line number, raw row dict) from a JSON Lines text stream
+def iter_jsonl(stream):
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield line_no, ValueError("expected a JSON object")
+            continue
+        yield line_no, {str(k).strip().lower(): v for k, v in row.items()}
+
+
+# Rows from a binary file (upload or open(path, "rb")) in the given format
+def iter_rows(binary_file, fmt):
+    stream = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    return iter_csv(stream) if fmt == "csv" else iter_jsonl(stream)
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _number(value, kind, name, low=None, high=None):
+    value = _text(value)
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if not math.isfinite(number):  # inf overflows int(), NaN slips past the range check
+        raise ValueError(f"{name} must be a finite number, got {value!r}")
+    number = kind(number)
+    if (low is not None and number < low) or (high is not None and number > high):
+        raise ValueError(f"{name} must be between {low} and {high}, got {value!r}")
+    return number
+
+
+# Dates are stored as "YYYY-MM-DD HH:MM:SS" so that they sort, and group
+# by month in the rollup, like the dates the app writes
+def _date(value, name):
+    value = _text(value)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).strftime(DATE_FORMAT)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date such as 2024-05-06, got {value!r}")
+
+
+# Validate one raw row and return the tuple to insert (IMPORT_COLUMNS order).
+# Raises ValueError describing the first problem found.
+def validate_row(raw, now):
+    title, author = _text(raw.get("title")), _text(raw.get("author"))
+    if not title or not author:
+        raise ValueError("title and author are required")
+
+    genre = _text(raw.get("genre")) or "Other"
+    if genre not in GENRES:
+        raise ValueError(f"genre must be one of {', '.join(GENRES)}, got {genre!r}")
+    status = _text(raw.get("status")) or "To Read"
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}, got {status!r}")
+
+    return (
+        title,
+        author,
+        genre,
+        _text(raw.get("isbn")),
+        _number(raw.get("publication_year"), int, "publication_year", 0, datetime.now().year),
+        _number(raw.get("pages"), int, "pages", 1),
+        _number(raw.get("rating"), float, "rating", 0, 5) or 0.0,
+        status,
+        _date(raw.get("date_added"), "date_added") or now[:19],
+        _text(raw.get("notes")),
+    )
+
+
+def _normalize_isbn(isbn):
+    return "".join(ch for ch in isbn if ch.isalnum()).upper() if isbn else None
+
+
+def _dedupe_key(row, dedupe):
+    if dedupe == "isbn":
+        return _normalize_isbn(row[3])
+    return row[0].casefold(), row[1].casefold()
+
+
+def _existing_keys(conn, dedupe):
+    if dedupe == "isbn":
+        return {_normalize_isbn(isbn) for (isbn,) in conn.execute(
+            "SELECT isbn FROM live_books WHERE isbn IS NOT NULL AND isbn <> ''")}
+    return {(title.casefold(), author.casefold())
+            for title, author in conn.execute("SELECT title, author FROM live_books")}
+
+
+# Stream rows into the books table in large executemany transactions.
+# rows yields (line number, raw dict or ValueError). dedupe is None, "isbn"
+# or "title-author"; duplicates of existing books or of earlier rows in the
+# same import are skipped. progress(report) is called after every batch.
+def import_books(conn, rows, dedupe=None, batch_size=5000, progress=None):
+    report = ImportReport()
+    started = time.perf_counter()
+    now = timestamp()
+    seen = _existing_keys(conn, dedupe) if dedupe else None
+    insert = (
+        f"INSERT INTO books ({', '.join(IMPORT_COLUMNS)}, updated_at) "
+        f"VALUES ({', '.join('?' for _ in IMPORT_COLUMNS)}, ?)"
+    )
+
+    def write_batch(batch):
+        with conn:
+            conn.executemany(insert, [row + (now,) for row in batch])
+
+    def flush(batch):
+        retry_on_busy(lambda: write_batch(batch))
+        report.inserted += len(batch)
+        report.elapsed = time.perf_counter() - started
+        if progress:
+            progress(report)
+
+    batch = []
+    for line, raw in rows:
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            row = validate_row(raw, now)
+        except ValueError as e:
+            report.add_error(line, str(e))
+            continue
+
+        if seen is not None:
+            key = _dedupe_key(row, dedupe)
+            if key in seen:
+                report.duplicates += 1
+                continue
+            if key:
+                seen.add(key)
+
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    report.elapsed = time.perf_counter() - started
+    return report
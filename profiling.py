@@ -0,0 +1,220 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+TIMING_WINDOW = 1000  # most recent samples kept per timed section
+QUERY_LOG_SIZE = 2000  # most recent SQL statements kept
+
+_lock = threading.Lock()
+_timings = defaultdict(lambda: deque(maxlen=TIMING_WINDOW))  # section -> recent durations
+_totals = defaultdict(lambda: [0, 0.0])  # section -> [count, seconds] since start
+_queries = deque(maxlen=QUERY_LOG_SIZE)
+_query_totals = [0, 0.0]  # [statements, seconds] since start, including fetches
+
+
+def record_timing(name, seconds):
+    with _lock:
+        _timings[name].append(seconds)
+        totals = _totals[name]
+        totals[0] += 1
+        totals[1] += seconds
+
+
+# Time the enclosed block under `name`
+@contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+
+# Decorator form of timed(); the section name defaults to the function name
+def profiled(name=None):
+    def decorate(fn):
+        section = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(section):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# One executed SQL statement. Rows and time spent fetching are added as the
+# caller reads the results.
+class QueryRecord:
+    __slots__ = ("sql", "started_at", "seconds", "rows")
+
+    def __init__(self, sql, started_at):
+        self.sql = sql
+        self.started_at = started_at
+        self.seconds = 0.0
+        self.rows = 0
+
+
+# Cursor that logs every statement it runs with its duration and row count
+class ProfiledCursor(sqlite3.Cursor):
+    _record = None
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters)
+
+    def _run(self, method, sql, arg):
+        record = QueryRecord(sql, time.time())
+        start = time.perf_counter()
+        try:
+            return method(sql, arg)
+        finally:
+            record.seconds = time.perf_counter() - start
+            record.rows = max(self.rowcount, 0)  # statements that change rows
+            self._record = record
+            with _lock:
+                _queries.append(record)
+                _query_totals[0] += 1
+                _query_totals[1] += record.seconds
+
+    def _fetched(self, start, rows):
+        if self._record is not None:
+            seconds = time.perf_counter() - start
+            self._record.seconds += seconds
+            self._record.rows += rows
+            with _lock:
+                _query_totals[1] += seconds
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._fetched(start, 1)
+        return row
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _normalize(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+# (section, samples, p50, p95, max) over the recent window, slowest p95 first
+def timing_summary():
+    with _lock:
+        samples = {name: sorted(values) for name, values in _timings.items() if values}
+    summary = [
+        (name, len(values), _percentile(values, 0.5), _percentile(values, 0.95), values[-1])
+        for name, values in samples.items()
+    ]
+    return sorted(summary, key=lambda row: row[3], reverse=True)
+
+
+# (sql, seconds, rows, started_at) of the slowest statements in the log
+def slowest_queries(limit=20):
+    with _lock:
+        records = list(_queries)
+    records.sort(key=lambda record: record.seconds, reverse=True)
+    return [(_normalize(r.sql), r.seconds, r.rows, r.started_at) for r in records[:limit]]
+
+
+# (sql, executions, total seconds, p50, p95, average rows) per distinct
+# statement in the log, most total time first
+def query_summary(limit=20):
+    with _lock:
+        records = list(_queries)
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[_normalize(record.sql)].append(record)
+    summary = []
+    for sql, group in grouped.items():
+        durations = sorted(record.seconds for record in group)
+        summary.append((
+            sql, len(group), sum(durations), _percentile(durations, 0.5), _percentile(durations, 0.95),
+            sum(record.rows for record in group) / len(group),
+        ))
+    summary.sort(key=lambda row: row[2], reverse=True)
+    return summary[:limit]
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+# Timings in the Prometheus text exposition format: a summary per section
+# (quantiles over the recent window, count and sum since start) and one for
+# SQL statements (quantiles over the query log, count and sum since start)
+def prometheus_text():
+    with _lock:
+        totals = {name: tuple(values) for name, values in _totals.items()}
+        query_count, query_seconds = _query_totals
+        durations = sorted(record.seconds for record in _queries)
+    quantiles = {name: (p50, p95) for name, _, p50, p95, _ in timing_summary()}
+
+    lines = [
+        "# HELP library_section_seconds Time spent in a page, fragment or other timed section.",
+        "# TYPE library_section_seconds summary",
+    ]
+    for name in sorted(totals):
+        label = f'section="{_label(name)}"'
+        if name in quantiles:
+            p50, p95 = quantiles[name]
+            lines.append(f'library_section_seconds{{{label},quantile="0.5"}} {p50:.6f}')
+            lines.append(f'library_section_seconds{{{label},quantile="0.95"}} {p95:.6f}')
+        count, seconds = totals[name]
+        lines.append(f"library_section_seconds_count{{{label}}} {count}")
+        lines.append(f"library_section_seconds_sum{{{label}}} {seconds:.6f}")
+
+    lines += [
+        "# HELP library_query_seconds Time spent running SQL statements and fetching their rows.",
+        "# TYPE library_query_seconds summary",
+    ]
+    if durations:
+        lines.append(f'library_query_seconds{{quantile="0.5"}} {_percentile(durations, 0.5):.6f}')
+        lines.append(f'library_query_seconds{{quantile="0.95"}} {_percentile(durations, 0.95):.6f}')
+    lines.append(f"library_query_seconds_count {query_count}")
+    lines.append(f"library_query_seconds_sum {query_seconds:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+# Write prometheus_text() to `path` atomically, e.g. for node_exporter's
+# textfile collector
+def write_prometheus(path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+# Clear the recent windows the Performance page shows. The totals since
+# start are Prometheus counters and keep counting.
+def reset():
+    with _lock:
+        _timings.clear()
+        _queries.clear()
@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+
+from database import (
+    apply_book_edits, count_books, delete_books, fetch_books_page, get_generation, get_library_totals,
+    get_stat_counts, insert_book, is_library_empty, record_progress, restore_books, search_library,
+    update_book, update_books,
+)
+
+# Row types. Slotted dataclasses keep the dozens to thousands of rows a page
+# holds small, and give pages names instead of row[n] positions.
+
+
+# One row of live_books, fields in BOOK_COLUMNS order
+@dataclass(slots=True, frozen=True)
+class Book:
+    id: int
+    title: str
+    author: str
+    genre: str
+    isbn: str | None
+    publication_year: int | None
+    pages: int | None
+    rating: float
+    status: str
+    date_added: str
+    notes: str | None
+    version: int
+    updated_at: str
+    deleted_at: str | None
+
+
+# A search result: the book plus the matching text with the match in **bold**
+@dataclass(slots=True, frozen=True)
+class SearchHit(Book):
+    snippet: str
+
+
+# A book being read, with the latest page recorded for it
+@dataclass(slots=True, frozen=True)
+class ReadingBook:
+    id: int
+    title: str
+    author: str
+    genre: str
+    pages: int | None
+    current_page: int
+    percent: float
+
+
+@dataclass(slots=True, frozen=True)
+class LibraryTotals:
+    books: int
+    pages: int
+    average_rating: float
+
+
+RECENT_BOOKS_SQL = "SELECT * FROM live_books ORDER BY date_added DESC LIMIT ?"
+READING_BOOKS_SQL = """
+SELECT id, title, author, genre, pages, COALESCE(current_page, 0), COALESCE(percent, 0)
+FROM book_progress
+WHERE status = 'Reading'
+ORDER BY progress_at DESC, title, id
+LIMIT ? OFFSET ?
+"""
+GENRES_SQL = "SELECT DISTINCT genre FROM live_books ORDER BY genre"
+BOOK_SQL = "SELECT * FROM live_books WHERE id = ?"
+
+
+# Everything the pages read and write, without Streamlit, so the CLI,
+# benchmarks and API share it. Reads run on the borrowed connection; the
+# statements are fixed strings, which sqlite3 prepares once per connection
+# and reuses from its statement cache. Writes go through the manager's
+# writer queue and can be called after the connection has been returned.
+class LibraryRepository:
+    def __init__(self, conn):
+        self.conn = conn
+        self.manager = conn.manager
+
+    def _fetch(self, row_type, sql, params):
+        cursor = self.conn.cursor()
+        cursor.row_factory = lambda _, row: row_type(*row)
+        return cursor.execute(sql, params).fetchall()
+
+    # Reads
+
+    def generation(self):
+        return get_generation(self.conn)
+
+    def is_empty(self):
+        return is_library_empty(self.conn)
+
+    def totals(self):
+        return LibraryTotals(*get_library_totals(self.conn))
+
+    # (group, number of books) pairs of a rollup dimension; see get_stat_counts
+    def stat_counts(self, dimension, limit=-1):
+        return get_stat_counts(self.conn, dimension, limit)
+
+    def count_books(self, status=None, genre=None):
+        return count_books(self.conn, status, genre)
+
+    # One page of books and the cursor of the next page (None on the last)
+    def books_page(self, status=None, genre=None, sort_by="Title", cursor=None, limit=24):
+        rows, next_cursor = fetch_books_page(self.conn, status, genre, sort_by, cursor, limit)
+        return [Book(*row) for row in rows], next_cursor
+
+    def get_book(self, book_id):
+        books = self._fetch(Book, BOOK_SQL, (book_id,))
+        return books[0] if books else None
+
+    def recent_books(self, limit=5):
+        return self._fetch(Book, RECENT_BOOKS_SQL, (limit,))
+
+    # Books being read, most recently updated first
+    def reading_books(self, limit=10, offset=0):
+        return self._fetch(ReadingBook, READING_BOOKS_SQL, (limit, offset))
+
+    def genres(self):
+        return [genre for genre, in self.conn.execute(GENRES_SQL)]
+
+    # (best matches, total number of matches)
+    def search(self, term, limit=50):
+        rows, total = search_library(self.conn, term, limit)
+        return [SearchHit(*row) for row in rows], total
+
+    # Writes
+
+    def add_book(self, values):
+        return self.manager.write(insert_book, values)
+
+    def update_book(self, book_id, expected_version, values):
+        return self.manager.write(update_book, book_id, expected_version, values)
+
+    def update_books(self, book_ids, changes):
+        return self.manager.write(update_books, book_ids, changes)
+
+    def apply_edits(self, edits):
+        return self.manager.write(apply_book_edits, edits)
+
+    def delete_books(self, book_ids):
+        return self.manager.write(delete_books, book_ids)
+
+    def restore_books(self, book_ids):
+        return self.manager.write(restore_books, book_ids)
+
+    def record_progress(self, updates):
+        return self.manager.write(record_progress, updates)